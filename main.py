@@ -41,6 +41,9 @@ PROACTIVE_REPLY_INSTRUCTION = (
     " - **情景感知**: 分析'最近群聊内容'判断当前讨论是否已结束或是一个新开端，结合'完整对话历史'理解前因后果，再做出决策。"
 )
 
+# 会重置或切换当前对话的 AstrBot 内置指令
+CONVERSATION_RESET_COMMANDS = frozenset({"reset", "new", "switch", "del", "groupnew"})
+
 # 添加src目录到Python路径 - 使用更安全的方式
 current_dir = Path(__file__).parent
 src_dir = current_dir / "src"
@@ -71,6 +74,8 @@ class GroupChatPluginEnhanced(Star):
     def __init__(self, context: Context, config: Any):
         super().__init__(context)
         self.config = config
+        # 详细日志开关在初始化时计算一次
+        self._detailed_logging = self._compute_detailed_logging()
         # 记录实例用于静态包装器访问
         GroupChatPluginEnhanced._instance = self
         
@@ -82,7 +87,7 @@ class GroupChatPluginEnhanced(Star):
         self.group_chat_buffer = defaultdict(list)
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 插件初始化开始，配置类型: {type(config).__name__}")
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 配置内容摘要: {self._summarize_config(config)}")
         
@@ -141,12 +146,12 @@ class GroupChatPluginEnhanced(Star):
         self.tool_cache_ttl = 300  # 5分钟缓存时间
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             components = [self.state_manager, self.group_list_manager, self.impression_manager, self.memory_integration, self.interaction_manager, self.response_engine, self.willingness_calculator, self.focus_chat_manager, self.fatigue_system, self.context_analyzer, self.active_chat_manager]
             initialized_count = len([comp for comp in components if comp is not None])
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 插件初始化完成，组件数量: {initialized_count}/{len(components)}")
     
-    def _is_detailed_logging(self) -> bool:
+    def _compute_detailed_logging(self) -> bool:
         """检查是否启用详细日志输出。"""
         try:
             # 检查配置中的enable_detailed_logging开关
@@ -565,12 +570,13 @@ class GroupChatPluginEnhanced(Star):
         except Exception:
             return ""
 
-    async def _detect_and_caption_at_images(self, message_event) -> Optional[Dict[str, Any]]:
+    async def _detect_and_caption_at_images(self, message_event, message_text: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         @消息图片检测并转文字描述函数
         
         Args:
             message_event: 消息事件对象
+            message_text: 已获取的消息文本，为None时从事件中获取
             
         Returns:
             如果符合@消息图片条件并处理成功，返回处理结果；否则返回None
@@ -607,7 +613,8 @@ class GroupChatPluginEnhanced(Star):
                 return None
         
             # 检查消息是否包含@ - 使用原始消息而不是处理后的消息
-            message_text = self._get_message_text(message_event)
+            if message_text is None:
+                message_text = self._get_message_text(message_event)
             
             # 尝试获取原始消息
             raw_message_text = ""
@@ -643,7 +650,7 @@ class GroupChatPluginEnhanced(Star):
             if not images:
                 return None
             
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"检测到@消息包含图片，开始图片转文字处理，图片数量: {len(images)}")
             
             # 获取服务提供商和提示词
@@ -673,7 +680,7 @@ class GroupChatPluginEnhanced(Star):
             # 合并图片描述和原消息
             combined_message = self._combine_captions_with_message(message_text, captions)
             
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"@消息图片转文字完成，原消息: {message_text[:100]}...，合并后消息: {combined_message[:100]}...")
             
             return {
@@ -951,7 +958,7 @@ class GroupChatPluginEnhanced(Star):
                 
                 if content:
                     # 检查是否启用详细日志
-                    if self._is_detailed_logging():
+                    if self._detailed_logging:
                         logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 非沉浸式对话JSON解析成功，content长度={len(content)}")
                     
                     # 过滤掉JSON结构，只保留content内容
@@ -1189,7 +1196,7 @@ class GroupChatPluginEnhanced(Star):
         try:
             logger.info(f"[图片检测] 开始调用_detect_and_caption_at_images")
             
-            processed_result = await self._detect_and_caption_at_images(event)
+            processed_result = await self._detect_and_caption_at_images(event, message_text)
             
             logger.info(f"[图片检测] _detect_and_caption_at_images返回结果类型: {type(processed_result)}")
             logger.info(f"[图片检测] _detect_and_caption_at_images返回结果内容: {processed_result}")
@@ -1346,7 +1353,7 @@ class GroupChatPluginEnhanced(Star):
             return True, message_text
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 检测到[图片]标识")
         
         # 检测纯图片消息（支持多种图片格式）
@@ -1379,7 +1386,7 @@ class GroupChatPluginEnhanced(Star):
         
         if is_pure_image:
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 消息仅包含[图片]标识，忽略消息")
             
             logger.info(f"[图片检测] 检测到纯图片消息: '{message_text}'，拦截但不清理沉浸式会话")
@@ -1461,7 +1468,7 @@ class GroupChatPluginEnhanced(Star):
             filtered_message = message_text.replace("[图片]", "").strip()
             
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 消息包含[图片]标识和其他文字，过滤后消息: '{filtered_message}'")
             
             logger.info(f"[图片检测] 检测到包含[图片]标识的消息，已移除标识，过滤后消息: '{filtered_message[:50]}...'")
@@ -1483,7 +1490,7 @@ class GroupChatPluginEnhanced(Star):
         logger.info(f"[沉浸式对话] 捕获到用户 {event.get_sender_id()} 的连续消息，开始判断是否回复。")
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 沉浸式对话会话存在，会话键: {session_key}")
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 会话数据: 上下文长度={len(session_data.get('context', []))}")
         
@@ -1495,14 +1502,14 @@ class GroupChatPluginEnhanced(Star):
                 logger.debug(f"[沉浸式对话] 已取消群 {group_id} 的主动插话任务。")
                 
                 # 检查是否启用详细日志
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 已取消群 {group_id} 的主动插话任务")
     
         # 阻止事件继续传播，避免触发默认的LLM回复
         event.stop_event()
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 已阻止事件传播，开始沉浸式对话处理")
     
         found_persona = await self._get_persona_info_str(event.unified_msg_origin)
@@ -1539,7 +1546,7 @@ class GroupChatPluginEnhanced(Star):
             return True
     
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 开始调用LLM进行沉浸式对话决策")
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 用户提示长度: {len(user_prompt)}")
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 上下文数量: {len(saved_context)}")
@@ -1769,12 +1776,12 @@ class GroupChatPluginEnhanced(Star):
                 logger.warning(f"[沉浸式对话] 保存对话历史失败: {e}")
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - LLM调用完成，响应长度: {len(llm_response.completion_text)}")
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 工具调用信息: names={llm_response.tools_call_name}, args={llm_response.tools_call_args}")
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - LLM响应文本预览: {llm_response.completion_text[:200]}")
         
         # 在AstrBot v4.0.0中，工具调用由ToolLoopAgentRunner自动处理
@@ -1788,7 +1795,7 @@ class GroupChatPluginEnhanced(Star):
         response_text = llm_response.completion_text.strip()
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - LLM响应处理开始，响应长度: {len(response_text)}")
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 响应内容预览: {response_text[:200]}")
         
@@ -1805,7 +1812,7 @@ class GroupChatPluginEnhanced(Star):
             logger.info(f"[沉浸式对话] LLM决定回复，内容: {response_text[:50]}...")
             
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 沉浸式对话决定回复，内容预览: {response_text[:100]}")
             
             # 发送回复
@@ -1824,7 +1831,7 @@ class GroupChatPluginEnhanced(Star):
                 await self._arm_immersive_session(event)
                 
                 # 检查是否启用详细日志
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 沉浸式回复已发送，会话已重新启动")
             else:
                 logger.info("[沉浸式对话] LLM响应为空")
@@ -1986,14 +1993,22 @@ class GroupChatPluginEnhanced(Star):
             logger.info(f"[沉浸式对话] 异常情况下返回空上下文，总长度: 0")
             return []
 
-    async def _save_bot_reply_to_conversation(self, event: AstrMessageEvent, reply_content: str):
-        """将机器人的回复保存到平台的对话历史记录中，支持图片附件信息"""
+    async def _save_bot_reply_to_conversation(self, event: AstrMessageEvent, reply_content: str, group_id: Optional[str] = None):
+        """将机器人的回复保存到平台的对话历史记录中，支持图片附件信息
+        
+        同时记录为该群最近一条机器人回复；event 不提供群组ID时（如主动插话）需传入 group_id。
+        """
+        if self.willingness_calculator:
+            try:
+                self.willingness_calculator.record_bot_reply(group_id or event.get_group_id(), reply_content)
+            except Exception as e:
+                logger.warning(f"[历史保存][bot] 记录最近机器人回复失败: {e}")
         try:
             uid = event.unified_msg_origin
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"[历史保存][bot] 开始保存机器人回复，UMO={uid}, 内容长度={len(reply_content) if reply_content else 0}")
             curr_cid = await self.context.conversation_manager.get_curr_conversation_id(uid)
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"[历史保存][bot] 当前对话ID: {curr_cid}")
             
             if not curr_cid:
@@ -2005,7 +2020,7 @@ class GroupChatPluginEnhanced(Star):
                 # 获取当前对话
                 conversation = await self.context.conversation_manager.get_conversation(uid, curr_cid)
                 if conversation:
-                    if self._is_detailed_logging():
+                    if self._detailed_logging:
                         logger.debug(f"[历史保存][bot] 获取对话成功，对话ID={curr_cid}, 对话类型={type(conversation).__name__}")
                     # 获取现有历史记录
                     existing_history = []
@@ -2030,7 +2045,7 @@ class GroupChatPluginEnhanced(Star):
                     
                     existing_history.append(new_message)
 
-                    if self._is_detailed_logging():
+                    if self._detailed_logging:
                         logger.debug(f"[历史保存][bot] 追加后历史长度={len(existing_history)}，准备持久化")
 
                     # 保存更新后的历史记录（带多重回退与详细日志）
@@ -2071,7 +2086,7 @@ class GroupChatPluginEnhanced(Star):
                                 stats["attachment_types"][attachment_type] = 0
                             stats["attachment_types"][attachment_type] += 1
             
-            if self._is_detailed_logging() and stats["total_attachments"] > 0:
+            if self._detailed_logging and stats["total_attachments"] > 0:
                 logger.debug(f"[附件统计] 历史记录包含 {stats['total_attachments']} 个附件，其中 {stats['image_attachments']} 个图片")
                 
         except Exception as e:
@@ -2094,7 +2109,7 @@ class GroupChatPluginEnhanced(Star):
                     }
                     attachments.append(attachment)
                         
-            if attachments and self._is_detailed_logging():
+            if attachments and self._detailed_logging:
                 logger.debug(f"[附件处理] AI回复中提取到 {len(attachments)} 个附件")
                 
         except Exception as e:
@@ -2129,7 +2144,7 @@ class GroupChatPluginEnhanced(Star):
                         }
                         attachments.append(attachment)
                         
-            if attachments and self._is_detailed_logging():
+            if attachments and self._detailed_logging:
                 logger.debug(f"[附件处理] 提取到 {len(attachments)} 个附件")
                 
         except Exception as e:
@@ -2137,26 +2152,37 @@ class GroupChatPluginEnhanced(Star):
             
         return attachments
 
+    def _clear_last_bot_reply(self, group_id: Optional[str]):
+        """清除群组记录的最近机器人回复（对话被重置、切换或新建时调用）"""
+        if not self.willingness_calculator:
+            return
+        try:
+            self.willingness_calculator.clear_bot_reply(group_id)
+        except Exception as e:
+            logger.warning(f"[历史保存] 清除最近机器人回复失败: {e}")
+
     async def _save_user_message_to_conversation(self, event: AstrMessageEvent, message_content: str):
         """将用户的消息保存到平台的对话历史记录中，支持图片附件信息"""
         try:
             uid = event.unified_msg_origin
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"[历史保存][user] 开始保存用户消息，UMO={uid}, 内容长度={len(message_content) if message_content else 0}")
             curr_cid = await self.context.conversation_manager.get_curr_conversation_id(uid)
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"[历史保存][user] 当前对话ID: {curr_cid}")
             
             if not curr_cid:
                 # 如果没有当前对话ID，创建一个新的对话
                 curr_cid = await self.context.conversation_manager.create_conversation(uid)
                 logger.info(f"[历史保存][user] 创建新对话ID: {curr_cid}")
+                # 新对话中不存在此前的机器人回复
+                self._clear_last_bot_reply(event.get_group_id())
             
             if curr_cid:
                 # 获取当前对话
                 conversation = await self.context.conversation_manager.get_conversation(uid, curr_cid)
                 if conversation:
-                    if self._is_detailed_logging():
+                    if self._detailed_logging:
                         logger.debug(f"[历史保存][user] 获取对话成功，对话ID={curr_cid}, 对话类型={type(conversation).__name__}")
                     # 获取现有历史记录
                     existing_history = []
@@ -2183,7 +2209,7 @@ class GroupChatPluginEnhanced(Star):
                     
                     existing_history.append(new_message)
 
-                    if self._is_detailed_logging():
+                    if self._detailed_logging:
                         logger.debug(f"[历史保存][user] 追加后历史长度={len(existing_history)}，准备持久化")
 
                     # 保存更新后的历史记录（带多重回退与详细日志）
@@ -2367,12 +2393,12 @@ class GroupChatPluginEnhanced(Star):
             enable_cleanup = cleanup_config.get("enable_cleanup", False)
             
             # 详细日志：消息清理功能状态
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 消息清理功能状态: 启用={enable_cleanup}")
             
             if not enable_cleanup:
                 # 详细日志：消息清理功能未启用
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 消息清理功能未启用，跳过清理")
                 return history_list
             
@@ -2381,7 +2407,7 @@ class GroupChatPluginEnhanced(Star):
             max_messages = cleanup_config.get("max_messages", 1000)
             
             # 详细日志：消息清理配置信息
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 消息清理配置: 目标群组数量={len(target_groups)}，最大消息数={max_messages}")
                 if target_groups:
                     logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 目标群组列表: {target_groups}")
@@ -2390,19 +2416,19 @@ class GroupChatPluginEnhanced(Star):
             group_id = self._extract_group_id_from_umo(unified_msg_origin)
             
             # 详细日志：群组ID提取结果
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 从UMO提取群组ID: {group_id}")
             
             if not group_id:
                 # 详细日志：无法提取群组ID
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 无法提取群组ID，跳过清理")
                 return history_list
             
             # 检查群组是否在目标列表中（如果目标列表为空，则对所有群组生效）
             if target_groups and group_id not in target_groups:
                 # 详细日志：群组不在目标列表中
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 群组 {group_id} 不在目标列表中，跳过清理")
                 return history_list
             
@@ -2410,12 +2436,12 @@ class GroupChatPluginEnhanced(Star):
             current_count = len(history_list)
             
             # 详细日志：当前历史记录数量
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 群组 {group_id} 当前历史记录数量: {current_count}")
             
             if current_count <= max_messages:
                 # 详细日志：历史记录未超出限制
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 历史记录未超出限制 ({current_count} <= {max_messages})，无需清理")
                 return history_list
             
@@ -2424,7 +2450,7 @@ class GroupChatPluginEnhanced(Star):
             cleaned_history = history_list[messages_to_remove:]
             
             # 详细日志：清理操作详情
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 执行消息清理: 删除最旧的 {messages_to_remove} 条消息")
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 清理前消息数量: {current_count}，清理后消息数量: {len(cleaned_history)}")
             
@@ -2496,25 +2522,25 @@ class GroupChatPluginEnhanced(Star):
             for m in methods:
                 if hasattr(cm, m):
                     try:
-                        if self._is_detailed_logging():
+                        if self._detailed_logging:
                             logger.debug(f"[官方保存] 尝试 {m} 使用列表参数，历史长度={len(history_list)}")
                         await getattr(cm, m)(unified_msg_origin, conversation_id, history_list)
-                        if self._is_detailed_logging():
+                        if self._detailed_logging:
                             logger.debug(f"[官方保存] {m} 成功（列表）")
                         return True
                     except TypeError as te:
                         # 尝试字符串格式
-                        if self._is_detailed_logging():
+                        if self._detailed_logging:
                             logger.debug(f"[官方保存] {m} 列表参数类型不匹配，尝试字符串; 错误: {te}")
                     except Exception as e:
                         logger.debug(f"[官方保存] {m}（列表）失败: {e}")
 
                     try:
                         history_str = json.dumps(history_list, ensure_ascii=False)
-                        if self._is_detailed_logging():
+                        if self._detailed_logging:
                             logger.debug(f"[官方保存] 尝试 {m} 使用字符串参数，长度={len(history_str)}")
                         await getattr(cm, m)(unified_msg_origin, conversation_id, history_str)
-                        if self._is_detailed_logging():
+                        if self._detailed_logging:
                             logger.debug(f"[官方保存] {m} 成功（字符串）")
                         return True
                     except Exception as e2:
@@ -2523,7 +2549,7 @@ class GroupChatPluginEnhanced(Star):
             # 逐条消息尝试追加类API
             single_msg_methods = [m for m in methods if m in ("append_message", "add_message", "add_conversation_message", "push_message") and hasattr(cm, m)]
             if single_msg_methods:
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"[官方保存] 尝试使用逐条追加API: {single_msg_methods}")
                 for msg in history_list:
                     role = (msg.get("role") if isinstance(msg, dict) else None) or "assistant"
@@ -2555,7 +2581,7 @@ class GroupChatPluginEnhanced(Star):
                 try:
                     conversation = await cm.get_conversation(unified_msg_origin, conversation_id)
                     if conversation and getattr(conversation, "history", None):
-                        if self._is_detailed_logging():
+                        if self._detailed_logging:
                             logger.debug("[官方保存] 逐条追加后对话存在历史，认为保存成功")
                         return True
                 except Exception as e:
@@ -2569,7 +2595,7 @@ class GroupChatPluginEnhanced(Star):
                     if hasattr(conversation, "history"):
                         conversation.history = history_str
                         if hasattr(cm, "save_conversation"):
-                            if self._is_detailed_logging():
+                            if self._detailed_logging:
                                 logger.debug(f"[官方保存] 使用 save_conversation 进行最终回退保存")
                             await cm.save_conversation(unified_msg_origin, conversation_id, conversation)
                             return True
@@ -2672,7 +2698,7 @@ class GroupChatPluginEnhanced(Star):
             delay = self.config.get("proactive_reply_delay", 8)
             
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 主动插话任务开始，群组ID: {group_id}, 延迟时间: {delay}秒")
             
             await asyncio.sleep(delay)
@@ -2681,7 +2707,7 @@ class GroupChatPluginEnhanced(Star):
             async with self.proactive_lock:
                 if self.active_proactive_timers.get(group_id) is not asyncio.current_task():
                     # 检查是否启用详细日志
-                    if self._is_detailed_logging():
+                    if self._detailed_logging:
                         logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 主动插话任务已取消或替换，群组ID: {group_id}")
                     return
                 if group_id in self.group_chat_buffer:
@@ -2691,7 +2717,7 @@ class GroupChatPluginEnhanced(Star):
                 logger.debug(f"[主动插话] 群 {group_id} 在 {delay}s 内无新消息，任务结束。")
                 
                 # 检查是否启用详细日志
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 主动插话无新消息，任务结束，群组ID: {group_id}")
                 return
 
@@ -2702,7 +2728,7 @@ class GroupChatPluginEnhanced(Star):
             logger.debug(f"[主动插话] 设置主动插话互斥标记，群组ID: {group_id}")
             
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 主动插话收集到消息，数量: {len(chat_history)}")
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 消息预览: {chat_history[:3] if len(chat_history) > 3 else chat_history}")
 
@@ -2725,7 +2751,7 @@ class GroupChatPluginEnhanced(Star):
             instruction = PROACTIVE_REPLY_INSTRUCTION
             
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 主动插话准备调用LLM，群组ID: {group_id}")
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 用户提示长度: {len(user_prompt)}")
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 历史上下文数量: {len(history)}")
@@ -2736,7 +2762,7 @@ class GroupChatPluginEnhanced(Star):
                 logger.warning("[主动插话] 未找到可用的大语言模型提供商。")
                 
                 # 检查是否启用详细日志
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 主动插话未找到可用LLM提供商")
                 return
 
@@ -2747,14 +2773,14 @@ class GroupChatPluginEnhanced(Star):
             )
             
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 主动插话LLM调用完成，响应长度: {len(llm_response.completion_text)}")
             
             # 优化版本：直接处理LLM响应，不再使用JSON格式
             response_text = llm_response.completion_text.strip()
             
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 主动插话LLM响应处理开始，响应长度: {len(response_text)}")
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 响应内容预览: {response_text[:200]}")
             
@@ -2768,7 +2794,7 @@ class GroupChatPluginEnhanced(Star):
                 logger.info(f"[主动插话] LLM决定插话，内容: {response_text[:50]}...")
                 
                 # 检查是否启用详细日志
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 主动插话决定回复，内容预览: {response_text[:100]}")
                 
                 # 发送回复
@@ -2780,12 +2806,12 @@ class GroupChatPluginEnhanced(Star):
                     from types import SimpleNamespace
                     mock_event = SimpleNamespace()
                     mock_event.unified_msg_origin = unified_msg_origin
-                    await self._save_bot_reply_to_conversation(mock_event, response_text)
+                    await self._save_bot_reply_to_conversation(mock_event, response_text, group_id)
                 except Exception as e:
                     logger.warning(f"[主动插话] 保存回复到平台历史失败: {e}")
                 
                 # 检查是否启用详细日志
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 主动插话回复已发送")
             else:
                 logger.info("[主动插话] LLM响应为空，保持沉默")
@@ -2871,11 +2897,11 @@ class GroupChatPluginEnhanced(Star):
             timestamp_info = f"[Time: {current_time}]"
             
             # 详细日志：时间戳功能状态
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 时间戳显示功能已启用，当前时间: {current_time}")
         else:
             # 详细日志：时间戳功能状态
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 时间戳显示功能未启用")
         
         # 如果消息内容不为空，在消息前面添加发送者信息和时间戳
@@ -2887,7 +2913,7 @@ class GroupChatPluginEnhanced(Star):
                 event.message_str = f"{sender_info} {event.message_str}"
             
             # 详细日志：消息内容修改
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 new_length = len(event.message_str)
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 消息内容已修改，原始长度: {original_length}，新长度: {new_length}")
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 修改后消息预览: {event.message_str[:100]}...")
@@ -2933,6 +2959,11 @@ class GroupChatPluginEnhanced(Star):
         # 判断是否以任一指令前缀开头
         if any(raw_message.startswith(prefix) for prefix in command_prefixes):
             logger.debug("[调试] 命中指令前缀，清理并跳过沉浸式")
+            # 重置或切换对话的指令：清除记录的最近机器人回复
+            prefix = next(prefix for prefix in command_prefixes if raw_message.startswith(prefix))
+            command_parts = raw_message[len(prefix):].split(maxsplit=1)
+            if command_parts and command_parts[0] in CONVERSATION_RESET_COMMANDS:
+                self._clear_last_bot_reply(event.get_group_id())
             session_key = (event.get_group_id(), event.get_sender_id())
             async with self.immersive_lock:
                 if session_key in self.immersive_sessions:
@@ -3004,7 +3035,7 @@ class GroupChatPluginEnhanced(Star):
         user_id = event.get_sender_id()
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 开始处理群聊消息，群组ID: {group_id}, 用户ID: {user_id}")
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 消息内容: {event.message_str[:100] if event.message_str else '空消息'}")
         
@@ -3062,7 +3093,7 @@ class GroupChatPluginEnhanced(Star):
                     custom_prompt = system_prompt_config.get("custom_prompt", "").strip()
                     
                     # 详细日志：系统提示词功能状态
-                    if self._is_detailed_logging():
+                    if self._detailed_logging:
                         logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 系统提示词功能状态: 启用={enable_system_prompt}")
                         if enable_system_prompt:
                             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 自定义提示词长度: {len(custom_prompt)} 字符")
@@ -3072,16 +3103,16 @@ class GroupChatPluginEnhanced(Star):
                         if system_prompt:
                             system_prompt += f"\n\n【自定义系统提示词】\n{custom_prompt}"
                             # 详细日志：系统提示词已合并
-                            if self._is_detailed_logging():
+                            if self._detailed_logging:
                                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 已合并人格提示词和自定义系统提示词")
                         else:
                             system_prompt = f"【自定义系统提示词】\n{custom_prompt}"
                             # 详细日志：系统提示词已应用
-                            if self._is_detailed_logging():
+                            if self._detailed_logging:
                                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 已应用自定义系统提示词")
                     else:
                         # 详细日志：系统提示词未应用
-                        if self._is_detailed_logging():
+                        if self._detailed_logging:
                             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 未应用自定义系统提示词")
                 
                 # ✅ 新增：添加工具识别功能
@@ -3096,7 +3127,7 @@ class GroupChatPluginEnhanced(Star):
                                 system_prompt = tools_prompt
                             
                             logger.info(f"[工具识别] 已向AI提供{len(available_tools)}个可用工具信息")
-                            if self._is_detailed_logging():
+                            if self._detailed_logging:
                                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 工具提示词预览: {tools_prompt[:200]}...")
                         else:
                             logger.debug("[工具识别] 未找到可用工具")
@@ -3194,7 +3225,7 @@ class GroupChatPluginEnhanced(Star):
                         existing_texts.add(content_str)
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 聊天上下文分析完成，消息数量: {len(chat_context.get('messages', []))}")
         
         # 判断交互模式
@@ -3204,12 +3235,12 @@ class GroupChatPluginEnhanced(Star):
         interaction_mode = self.interaction_manager.determine_interaction_mode(chat_context)
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 交互模式判断结果: {interaction_mode}")
         
         # 观察模式不回复
         if interaction_mode == "observation":
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 当前为观察模式，跳过回复处理")
             return
         
@@ -3220,12 +3251,12 @@ class GroupChatPluginEnhanced(Star):
         willingness_result = await self.willingness_calculator.calculate_response_willingness(event, chat_context)
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 意愿计算结果: {willingness_result}")
         
         # 如果不需要 LLM 决策且意愿不足，直接跳过
         if not willingness_result.get("requires_llm_decision") and not willingness_result.get("should_respond"):
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 不需要LLM决策且意愿不足，跳过回复")
             return
         
@@ -3235,12 +3266,12 @@ class GroupChatPluginEnhanced(Star):
         if self.state_manager:
             consecutive_count = self.state_manager.get_consecutive_responses().get(group_id, 0)
         if consecutive_count >= max_consecutive:
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 连续回复限制已达上限 ({consecutive_count}/{max_consecutive})，跳过回复")
             return
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 当前连续回复计数: {consecutive_count}/{max_consecutive}")
         
         # 检查主动插话是否正在进行，如果是则跳过读空气功能
@@ -3263,7 +3294,7 @@ class GroupChatPluginEnhanced(Star):
         response_result = await self.response_engine.generate_response(event, chat_context, willingness_result)
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 回复生成结果: {response_result}")
         
         # 根据结果决定是否回复
@@ -3271,7 +3302,7 @@ class GroupChatPluginEnhanced(Star):
             response_content = response_result.get("content")
             if response_content:
                 # 检查是否启用详细日志
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 决定回复，内容长度: {len(response_content)}，内容预览: {response_content[:100]}")
                 
                 yield event.plain_result(response_content)
@@ -3296,7 +3327,7 @@ class GroupChatPluginEnhanced(Star):
                 logger.debug(f"群组 {group_id} 回复 - 方法: {decision_method}, 意愿分: {willingness_score:.2f}")
                 
                 # 检查是否启用详细日志
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 回复已发送，连续回复计数已更新")
         else:
             # 记录跳过回复的原因
@@ -3306,7 +3337,7 @@ class GroupChatPluginEnhanced(Star):
             logger.debug(f"群组 {group_id} 跳过回复 - 方法: {decision_method}, 原因: {skip_reason}, 意愿分: {willingness_score:.2f}")
             
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 跳过回复，原因: {skip_reason}")
         
         # 更新交互状态
@@ -3314,7 +3345,7 @@ class GroupChatPluginEnhanced(Star):
             await self.interaction_manager.update_interaction_state(event, chat_context, response_result)
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"GroupChatPluginEnhanced: 详细日志 - 交互状态已更新，消息处理完成")
         
         # 清除读空气主动对话互斥标记
@@ -3446,14 +3477,16 @@ class GroupChatPluginEnhanced(Star):
             - has_images: 是否包含图片
             - filtered_message: 过滤掉图片标识符后的消息文本
         """
+        # 消息文本只提取一次，供后续各处理分支复用
+        message_text = self._get_message_text(message_event)
         
         # 第一步：先调用@消息图片检测函数，确保@消息的图片不会被拦截
-        at_image_result = await self._detect_and_caption_at_images(message_event)
+        at_image_result = await self._detect_and_caption_at_images(message_event, message_text)
         if at_image_result:
             return at_image_result
         
         # 第二步：再调用消息图片拦截函数，处理其他消息的图片
-        return await self._intercept_other_images(message_event)
+        return await self._intercept_other_images(message_event, message_text)
 
     async def terminate(self):
         """插件终止时的清理工作"""
@@ -3475,9 +3508,14 @@ class GroupChatPluginEnhanced(Star):
             self.active_proactive_timers.clear()
             self.group_chat_buffer.clear()
         
-        # 使用状态管理器清理所有持久化状态
+        # 清空意愿计算器的文本缓存（模块在重载后可能仍被复用）
+        if self.willingness_calculator:
+            self.willingness_calculator.clear_caches()
+        
+        # 使用状态管理器清理所有持久化状态，写入尚未保存的变更并停止后台写盘
         if self.state_manager:
             self.state_manager.clear_all_state()
+            await self.state_manager.aclose()
         logger.info("增强版群聊插件已终止")
 
     # 搜索适配机制：工具错误处理
@@ -11,6 +11,7 @@ __version__ = "V2.0.4"
 __author__ = "Him666233"
 __description__ = "上下文分析器模块：负责分析聊天上下文"
 
+import asyncio
 import json
 from typing import TYPE_CHECKING, Any, Dict
 
@@ -31,11 +32,13 @@ class ContextAnalyzer:
                  memory_integration: "MemoryIntegration"):
         self.context = context
         self.config = config
+        # 详细日志开关在初始化时计算一次
+        self._detailed_logging = self._compute_detailed_logging()
         self.state_manager = state_manager
         self.impression_manager = impression_manager
         self.memory_integration = memory_integration
 
-    def _is_detailed_logging(self) -> bool:
+    def _compute_detailed_logging(self) -> bool:
         """检查是否启用详细日志"""
         try:
             # 检查配置中的enable_detailed_logging开关
@@ -49,14 +52,14 @@ class ContextAnalyzer:
         """分析聊天上下文"""
         try:
             # 详细日志：开始分析聊天上下文
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"[上下文分析器] 开始分析聊天上下文 - 群组: {event.get_group_id()}, 用户: {event.get_sender_id()}")
             
             group_id = event.get_group_id()
             user_id = event.get_sender_id()
 
             # 详细日志：获取对话历史
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"[上下文分析器] 获取对话历史 - 群组: {group_id}, 用户: {user_id}")
             
             curr_cid = await self.context.conversation_manager.get_curr_conversation_id(event.unified_msg_origin)
@@ -74,46 +77,39 @@ class ContextAnalyzer:
                         logger.warning(f"[上下文分析器] JSON解析失败: {e}")
                         conversation_history = []
                     # 详细日志：对话历史获取成功
-                    if self._is_detailed_logging():
+                    if self._detailed_logging:
                         logger.debug(f"[上下文分析器] 对话历史获取成功 - 群组: {group_id}, 历史记录数: {len(conversation_history)}")
             else:
                 # 详细日志：无当前对话ID
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"[上下文分析器] 无当前对话ID - 群组: {group_id}")
 
-            # 详细日志：获取用户印象
-            if self._is_detailed_logging():
-                logger.debug(f"[上下文分析器] 获取用户印象 - 群组: {group_id}, 用户: {user_id}")
+            # 详细日志：获取用户印象和相关记忆
+            if self._detailed_logging:
+                logger.debug(f"[上下文分析器] 获取用户印象和相关记忆 - 群组: {group_id}, 用户: {user_id}, 消息内容长度: {len(event.message_str)}")
             
-            user_impression = await self.impression_manager.get_user_impression(user_id, group_id)
-            
-            # 详细日志：用户印象获取完成
-            if self._is_detailed_logging():
-                logger.debug(f"[上下文分析器] 用户印象获取完成 - 群组: {group_id}, 用户: {user_id}")
-
-            # 详细日志：获取相关记忆
-            if self._is_detailed_logging():
-                logger.debug(f"[上下文分析器] 获取相关记忆 - 群组: {group_id}, 消息内容长度: {len(event.message_str)}")
-            
-            # 获取相关记忆（不使用关键词，基于内容语义）
-            relevant_memories = await self.memory_integration.recall_memories(
-                message_content=event.message_str,
-                group_id=group_id
+            # 用户印象与相关记忆（基于内容语义，不使用关键词）相互独立，并发获取
+            user_impression, relevant_memories = await asyncio.gather(
+                self.impression_manager.get_user_impression(user_id, group_id),
+                self.memory_integration.recall_memories(
+                    message_content=event.message_str,
+                    group_id=group_id
+                )
             )
             
-            # 详细日志：相关记忆获取完成
-            if self._is_detailed_logging():
-                logger.debug(f"[上下文分析器] 相关记忆获取完成 - 群组: {group_id}, 记忆数量: {len(relevant_memories)}")
+            # 详细日志：用户印象和相关记忆获取完成
+            if self._detailed_logging:
+                logger.debug(f"[上下文分析器] 用户印象和相关记忆获取完成 - 群组: {group_id}, 用户: {user_id}, 记忆数量: {len(relevant_memories)}")
 
             # 详细日志：获取对话统计
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"[上下文分析器] 获取对话统计 - 群组: {group_id}")
             
             conversation_counts = self.state_manager.get_conversation_counts()
             group_counts = conversation_counts.get(group_id, {})
 
             # 详细日志：构建上下文结果
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"[上下文分析器] 构建上下文结果 - 群组: {group_id}, 用户: {user_id}")
             
             result = {
@@ -129,7 +125,7 @@ class ContextAnalyzer:
             }
             
             # 详细日志：上下文分析完成
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"[上下文分析器] 上下文分析完成 - 群组: {group_id}, 用户: {user_id}")
             
             return result
@@ -60,6 +60,8 @@ class FrequencyControl:
         self.group_id = group_id
         self.state_manager = state_manager
         self.config = config
+        # 详细日志开关在初始化时计算一次
+        self._detailed_logging = self._compute_detailed_logging()
         self.historical_hourly_avg_users = [0.0] * 24
         self.historical_hourly_avg_msgs = [0.0] * 24
 
@@ -81,7 +83,7 @@ class FrequencyControl:
         self.at_boost_value = float(getattr(self.config, "at_boost_value", 0.5)) if self.config is not None else 0.5
         self.threshold = float(getattr(self.config, "heartbeat_threshold", 0.55)) if self.config is not None else 0.55  # 触发阈值（可运行期调整）
 
-    def _is_detailed_logging(self) -> bool:
+    def _compute_detailed_logging(self) -> bool:
         """检查是否启用详细日志"""
         try:
             # 检查配置中的enable_detailed_logging开关
@@ -94,7 +96,7 @@ class FrequencyControl:
     def load_historical_data(self):
         """从历史数据加载或生成基础数据。"""
         # 详细日志：开始加载历史数据
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"[频率控制器] 开始加载历史数据 - 群组: {self.group_id}")
         
         if self.state_manager:
@@ -114,7 +116,7 @@ class FrequencyControl:
                 self._calculate_historical_averages()
                 
                 # 详细日志：成功加载历史数据
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"[频率控制器] 成功加载历史数据 - 群组: {self.group_id}")
                 logger.info(f"为群组 {self.group_id} 加载了历史数据。")
                 return
@@ -123,7 +125,7 @@ class FrequencyControl:
         self._generate_smart_defaults()
         
         # 详细日志：生成智能默认数据
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"[频率控制器] 生成智能默认历史数据 - 群组: {self.group_id}")
         logger.info(f"为群组 {self.group_id} 生成了智能默认的历史数据。")
 
@@ -189,7 +191,7 @@ class FrequencyControl:
     def update_message_rate(self, message_timestamp: float, user_id: str = None):
         """记录一条新消息并更新频率指标。"""
         # 详细日志：开始更新消息频率
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"[频率控制器] 开始更新消息频率 - 群组: {self.group_id}, 用户: {user_id}")
         
         self.recent_messages.append(message_timestamp)
@@ -204,7 +206,7 @@ class FrequencyControl:
         self._update_focus()
         
         # 详细日志：消息频率更新完成
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             current_focus = self.focus_value
             logger.debug(f"[频率控制器] 消息频率更新完成 - 群组: {self.group_id}, 当前焦点值: {current_focus:.3f}")
 
@@ -273,7 +275,7 @@ class FrequencyControl:
     def _update_focus(self):
         """根据当前聊天活动与历史基线的对比，更新焦点值。"""
         # 详细日志：开始更新焦点值
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"[频率控制器] 开始更新焦点值 - 群组: {self.group_id}")
         
         current_time = time.time()
@@ -288,7 +290,7 @@ class FrequencyControl:
         historical_msgs = self.historical_hourly_avg_msgs[current_hour] / 60.0  # 每分钟
         
         # 详细日志：当前活动与历史基线对比
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"[频率控制器] 当前活动分析 - 当前小时: {current_hour}, 最近1分钟消息数: {messages_in_last_minute}, 历史基线: {historical_msgs:.2f}条/分钟")
         
         # 这是一个简化的调整逻辑；后续会进行改进
@@ -296,12 +298,12 @@ class FrequencyControl:
         if messages_in_last_minute > historical_msgs * 1.5:
             target_focus += self.FOCUS_INCREASE_RATE * (delta_time / 60)  # 增加焦点
             # 详细日志：增加焦点值
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"[频率控制器] 增加焦点值 - 当前消息数超过历史基线1.5倍, 目标焦点: {target_focus:.3f}")
         else:
             target_focus -= self.FOCUS_DECREASE_RATE * (delta_time / 60)  # 减少焦点
             # 详细日志：减少焦点值
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"[频率控制器] 减少焦点值 - 当前消息数低于历史基线1.5倍, 目标焦点: {target_focus:.3f}")
 
         # 应用平滑处理
@@ -309,7 +311,7 @@ class FrequencyControl:
         self.focus_value += (target_focus - self.focus_value) * self.smoothing_factor
         
         # 详细日志：平滑处理结果
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"[频率控制器] 平滑处理 - 旧焦点: {old_focus:.3f}, 新焦点: {self.focus_value:.3f}, 平滑因子: {self.smoothing_factor}")
 
         # 应用 @ 消息的衰减增强
@@ -319,7 +321,7 @@ class FrequencyControl:
             self.at_message_boost = 0.0
         
         # 详细日志：@消息增强衰减
-        if self._is_detailed_logging() and old_boost != self.at_message_boost:
+        if self._detailed_logging and old_boost != self.at_message_boost:
             logger.debug(f"[频率控制器] @消息增强衰减 - 旧增强值: {old_boost:.3f}, 新增强值: {self.at_message_boost:.3f}")
 
         # 将焦点值限制在 0 和 1 之间
@@ -327,24 +329,24 @@ class FrequencyControl:
         self.focus_value = max(0, min(1, self.focus_value))
         
         # 详细日志：焦点值限制
-        if self._is_detailed_logging() and old_focus_clamped != self.focus_value:
+        if self._detailed_logging and old_focus_clamped != self.focus_value:
             logger.debug(f"[频率控制器] 焦点值限制 - 原始值: {old_focus_clamped:.3f}, 限制后: {self.focus_value:.3f}")
         
         # 详细日志：焦点值更新完成
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"[频率控制器] 焦点值更新完成 - 最终焦点值: {self.focus_value:.3f}, @消息增强: {self.at_message_boost:.3f}")
 
     def boost_on_at(self):
         """当机器人被 @ 时，临时提高焦点值。"""
         # 详细日志：开始处理@消息增强
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"[频率控制器] 开始处理@消息增强 - 群组: {self.group_id}")
         
         old_boost = self.at_message_boost
         self.at_message_boost = float(self.at_boost_value)  # 使用配置的初始增强值
         
         # 详细日志：@消息增强设置
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"[频率控制器] @消息增强设置 - 旧增强值: {old_boost:.3f}, 新增强值: {self.at_message_boost:.3f}, 配置值: {self.at_boost_value}")
         
         logger.info(f"机器人被 @，为群组 {self.group_id} 临时提高焦点。")
@@ -370,20 +372,20 @@ class FrequencyControl:
     def should_trigger_by_focus(self) -> bool:
         """根据焦点值决定是否触发回复。"""
         # 详细日志：开始检查是否触发回复
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"[频率控制器] 开始检查是否触发回复 - 群组: {self.group_id}")
         
         effective_focus = self.get_focus() + self.at_message_boost
         threshold = getattr(self, "threshold", 0.55)
         
         # 详细日志：当前焦点值和阈值
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"[频率控制器] 当前焦点值 - 基础焦点: {self.get_focus():.3f}, @增强: {self.at_message_boost:.3f}, 有效焦点: {effective_focus:.3f}, 阈值: {threshold:.3f}")
         
         # 只有当@消息增强值非常高时才快速触发
         if self.at_message_boost >= self.AT_MESSAGE_BOOST_THRESHOLD:  # 提高阈值，只有强烈@时才快速触发
             # 详细日志：@消息增强触发
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"[频率控制器] @消息增强触发 - 增强值: {self.at_message_boost:.3f} >= {self.AT_MESSAGE_BOOST_THRESHOLD}, 触发回复")
             return True
             
@@ -391,7 +393,7 @@ class FrequencyControl:
         messages_in_last_minute = self.get_messages_in_last_minute()
         if messages_in_last_minute >= self.MESSAGES_PER_MINUTE_THRESHOLD:  # 从2条提高到5条
             # 详细日志：消息活跃度触发
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"[频率控制器] 消息活跃度触发 - 最近1分钟消息数: {messages_in_last_minute} >= {self.MESSAGES_PER_MINUTE_THRESHOLD}, 触发回复")
             return True
             
@@ -400,7 +402,7 @@ class FrequencyControl:
         trigger_condition = effective_focus > threshold * self.THRESHOLD_BUFFER_MULTIPLIER  # 增加20%的缓冲
         
         # 详细日志：常规阈值检查结果
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"[频率控制器] 常规阈值检查 - 有效焦点: {effective_focus:.3f} > 阈值*1.2: {threshold * 1.2:.3f} = {trigger_condition}")
         
         return trigger_condition
\ No newline at end of file
@@ -14,10 +14,24 @@ __description__ = "图片处理模块：处理消息中的图片内容"
 
 import asyncio
 import re
-from typing import List, Optional, Dict, Any
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import List, Optional, Dict, Any, Union
 
 from astrbot.api import logger
 
+# 图片描述缓存的最大条目数
+CAPTION_CACHE_MAX_SIZE = 500
+# 同时向图片转文字服务提供商发起的最大请求数
+MAX_CONCURRENT_CAPTIONS = 4
+
+
+def _cache_key(image: str) -> Union[str, bytes]:
+    """生成图片描述缓存键：base64数据URI使用16字节摘要，URL保持原样"""
+    if image.startswith('data:'):
+        return blake2b(image.encode('utf-8', 'ignore'), digest_size=16).digest()
+    return image
+
 
 class ImageProcessor:
     """图片处理器"""
@@ -25,7 +39,8 @@ class ImageProcessor:
     def __init__(self, context, config):
         self.context = context
         self.config = config
-        self.caption_cache = {}
+        self.caption_cache: OrderedDict = OrderedDict()
+        self._caption_semaphore = asyncio.Semaphore(MAX_CONCURRENT_CAPTIONS)
     
     async def process_images(self, message_event) -> Dict[str, Any]:
         """
@@ -41,14 +56,16 @@ class ImageProcessor:
             - has_images: 是否包含图片
             - filtered_message: 过滤掉图片标识符后的消息文本
         """
+        # 消息文本只提取一次，供后续各处理分支复用
+        message_text = self._get_message_text(message_event)
         
         # 第一步：先调用@消息图片检测函数，确保@消息的图片不会被拦截
-        at_image_result = await self._detect_and_caption_at_images(message_event)
+        at_image_result = await self._detect_and_caption_at_images(message_event, message_text)
         if at_image_result:
             return at_image_result
         
         # 第二步：再调用消息图片拦截函数，处理其他消息的图片
-        return await self._intercept_other_images(message_event)
+        return await self._intercept_other_images(message_event, message_text)
     
     def _extract_images(self, message_event) -> List[str]:
         """提取消息中的图片"""
@@ -116,8 +133,6 @@ class ImageProcessor:
                     
                     if message_text and '[CQ:image' in message_text:
                         # 使用正则表达式提取CQ码图片的URL
-                        import re
-                        
                         # 记录原始消息文本用于调试
                         logger.debug(f"CQ码图片提取 - 原始消息文本: {message_text}")
                         
@@ -193,7 +208,7 @@ class ImageProcessor:
         
         return images
     
-    async def _process_direct_mode(self, images: List[str], message_event) -> Dict[str, Any]:
+    async def _process_direct_mode(self, images: List[str], message_text: str) -> Dict[str, Any]:
         """直接传递图片模式"""
         if self._is_detailed_logging():
             logger.debug("使用直接传递图片模式")
@@ -202,15 +217,16 @@ class ImageProcessor:
             "images": images,
             "captions": [],
             "has_images": True,
-            "filtered_message": self._get_message_text(message_event)
+            "filtered_message": message_text
         }
     
-    async def _detect_and_caption_at_images(self, message_event) -> Optional[Dict[str, Any]]:
+    async def _detect_and_caption_at_images(self, message_event, message_text: str) -> Optional[Dict[str, Any]]:
         """
         @消息图片检测并转文字描述函数
         
         Args:
             message_event: 消息事件对象
+            message_text: 已过滤图片标识符的消息文本
             
         Returns:
             如果符合@消息图片条件并处理成功，返回处理结果；否则返回None
@@ -247,7 +263,6 @@ class ImageProcessor:
                 return None
         
             # 检查消息是否包含@
-            message_text = self._get_message_text(message_event)
             logger.info(f"[_detect_and_caption_at_images] 检查消息文本: '{message_text}'")
             
             is_at = self._is_at_message(message_text, message_event)
@@ -307,12 +322,13 @@ class ImageProcessor:
             logger.error(f"[_detect_and_caption_at_images] 方法执行过程中发生异常: {e}", exc_info=True)
             return None
     
-    async def _intercept_other_images(self, message_event) -> Dict[str, Any]:
+    async def _intercept_other_images(self, message_event, message_text: str) -> Dict[str, Any]:
         """
         其他消息图片拦截函数
         
         Args:
             message_event: 消息事件对象
+            message_text: 已过滤图片标识符的消息文本
             
         Returns:
             处理结果字典，包含图片处理信息
@@ -328,7 +344,7 @@ class ImageProcessor:
                 "images": [],
                 "captions": [],
                 "has_images": False,
-                "filtered_message": self._get_message_text(message_event)
+                "filtered_message": message_text
             }
         
         # 提取消息中的图片
@@ -339,26 +355,26 @@ class ImageProcessor:
                 "images": [],
                 "captions": [],
                 "has_images": False,
-                "filtered_message": self._get_message_text(message_event)
+                "filtered_message": message_text
             }
         
         # 根据模式处理图片
         if image_mode == "direct":
             # 直接传递图片模式
-            return await self._process_direct_mode(images, message_event)
+            return await self._process_direct_mode(images, message_text)
         elif image_mode == "caption":
             # 图片转文字模式
-            return await self._process_caption_mode(images, message_event)
+            return await self._process_caption_mode(images, message_text)
         else:
             # 忽略模式
             return {
                 "images": [],
                 "captions": [],
                 "has_images": False,
-                "filtered_message": self._get_message_text(message_event)
+                "filtered_message": message_text
             }
     
-    async def _process_caption_mode(self, images: List[str], message_event) -> Dict[str, Any]:
+    async def _process_caption_mode(self, images: List[str], message_text: str) -> Dict[str, Any]:
         """图片转文字模式"""
         if self._is_detailed_logging():
             logger.debug("使用图片转文字模式")
@@ -382,7 +398,7 @@ class ImageProcessor:
                 "images": [],
                 "captions": [],
                 "has_images": False,
-                "filtered_message": self._get_message_text(message_event)
+                "filtered_message": message_text
             }
         
         # 为每张图片生成描述
@@ -395,7 +411,7 @@ class ImageProcessor:
             "images": [],
             "captions": captions,
             "has_images": len(captions) > 0,
-            "filtered_message": self._get_message_text(message_event)
+            "filtered_message": message_text
         }
     
     async def caption_images(self, images: List[str]) -> Optional[str]:
@@ -468,10 +484,12 @@ class ImageProcessor:
             图片描述文本，失败时返回None
         """
         # 检查缓存
-        if image in self.caption_cache:
+        cache_key = _cache_key(image)
+        if cache_key in self.caption_cache:
+            self.caption_cache.move_to_end(cache_key)
             if self._is_detailed_logging():
                 logger.debug(f"命中图片描述缓存: {image[:50]}...")
-            return self.caption_cache[image]
+            return self.caption_cache[cache_key]
         
         try:
             # ✅ 关键修复：参考astrbot_plugin_context_enhancer-main的正确实现
@@ -480,10 +498,11 @@ class ImageProcessor:
             logger.info(f"[图片转文字] 使用提示词: {prompt}")
             
             # 正确的调用方式：直接传递prompt和image_urls，不需要其他参数
-            llm_response = await asyncio.wait_for(
-                provider.text_chat(prompt=prompt, image_urls=[image]),
-                timeout=timeout
-            )
+            async with self._caption_semaphore:
+                llm_response = await asyncio.wait_for(
+                    provider.text_chat(prompt=prompt, image_urls=[image]),
+                    timeout=timeout
+                )
             
             caption = llm_response.completion_text
             
@@ -491,7 +510,10 @@ class ImageProcessor:
             
             # 缓存结果
             if caption:
-                self.caption_cache[image] = caption
+                self.caption_cache[cache_key] = caption
+                # 超出容量时淘汰最久未使用的条目
+                while len(self.caption_cache) > CAPTION_CACHE_MAX_SIZE:
+                    self.caption_cache.popitem(last=False)
                 if self._is_detailed_logging():
                     logger.debug(f"缓存图片描述: {image[:50]}... -> {caption}")
             
@@ -11,6 +11,7 @@ __version__ = "V2.0.4"
 __author__ = "Him666233"
 __description__ = "印象管理器模块：负责管理用户印象"
 
+import asyncio
 from typing import Any, Dict
 
 from astrbot.api import logger
@@ -46,6 +47,9 @@ class ImpressionManager:
                 person_name=user_id,
                 group_id=group_id
             )
+        except asyncio.CancelledError:
+            # 任务被取消属于正常流程，直接向上传递
+            raise
         except Exception as e:
             logger.error(f"获取用户印象失败: {e}")
             return {"score": 0.5, "summary": "获取印象失败"}
\ No newline at end of file
@@ -11,10 +11,14 @@ __version__ = "V2.0.4"
 __author__ = "Him666233"
 __description__ = "记忆集成模块：负责与 MemoraConnectPlugin 集成"
 
+import asyncio
 from typing import Any, List
 
 from astrbot.api import logger
 
+# 同时向记忆插件发起的最大请求数
+MAX_CONCURRENT_RECALLS = 4
+
 class MemoryIntegration:
     """记忆系统集成 - 只读"""
     
@@ -22,6 +26,7 @@ class MemoryIntegration:
         self.context = context
         self.config = config
         self.memora_plugin = self._init_memora_plugin()
+        self._recall_semaphore = asyncio.Semaphore(MAX_CONCURRENT_RECALLS)
     
     def _init_memora_plugin(self) -> Any:
         """初始化 MemoraConnectPlugin 连接"""
@@ -48,20 +53,24 @@ class MemoryIntegration:
             # 将消息内容转换为语义搜索，而不提取关键词
             search_content = message_content.strip()
 
-            # 如果外部插件支持语义搜索API，使用语义搜索
-            if hasattr(self.memora_plugin, 'recall_memories_semantic_api'):
-                return await self.memora_plugin.recall_memories_semantic_api(
-                    content=search_content,
-                    group_id=group_id,
-                    limit=max_limit
-                )
-            else:
-                # 回退方案：使用整个消息内容作为关键词（但这不是真正的关键词搜索）
-                # 注意：recall_memories_api 不支持 limit 参数
-                return await self.memora_plugin.recall_memories_api(
-                    keyword=search_content,
-                    group_id=group_id
-                )
+            async with self._recall_semaphore:
+                # 如果外部插件支持语义搜索API，使用语义搜索
+                if hasattr(self.memora_plugin, 'recall_memories_semantic_api'):
+                    return await self.memora_plugin.recall_memories_semantic_api(
+                        content=search_content,
+                        group_id=group_id,
+                        limit=max_limit
+                    )
+                else:
+                    # 回退方案：使用整个消息内容作为关键词（但这不是真正的关键词搜索）
+                    # 注意：recall_memories_api 不支持 limit 参数
+                    return await self.memora_plugin.recall_memories_api(
+                        keyword=search_content,
+                        group_id=group_id
+                    )
+        except asyncio.CancelledError:
+            # 任务被取消属于正常流程，直接向上传递
+            raise
         except Exception as e:
             logger.error(f"回忆记忆失败: {e}")
             return []
\ No newline at end of file
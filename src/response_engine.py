@@ -35,11 +35,13 @@ class ResponseEngine:
         """
         self.context = context
         self.config = config
+        # 详细日志开关在初始化时计算一次
+        self._detailed_logging = self._compute_detailed_logging()
         self.image_processor = image_processor
         # 人格缓存：{persona_name: {"prompt": str, "timestamp": float}}
         self._persona_cache = {}
     
-    def _is_detailed_logging(self) -> bool:
+    def _compute_detailed_logging(self) -> bool:
         """检查是否启用详细日志输出。"""
         try:
             # 检查配置中的enable_detailed_logging开关
@@ -80,7 +82,7 @@ class ResponseEngine:
         logger.debug(f"ResponseEngine: 开始生成回复。需要LLM决策: {willingness_result.get('requires_llm_decision')}")
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"ResponseEngine: 详细日志 - 意愿计算结果: {willingness_result}")
             logger.debug(f"ResponseEngine: 详细日志 - 聊天上下文摘要: {self._summarize_chat_context(chat_context)}")
         
@@ -217,7 +219,7 @@ class ResponseEngine:
             custom_prompt = system_prompt_config.get("custom_prompt", "").strip()
             
             # 详细日志：系统提示词功能状态
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"ResponseEngine: 详细日志 - 系统提示词功能状态: 启用={enable_system_prompt}")
                 if enable_system_prompt:
                     logger.debug(f"ResponseEngine: 详细日志 - 自定义提示词长度: {len(custom_prompt)} 字符")
@@ -228,11 +230,11 @@ class ResponseEngine:
                 base_prompt += f"\n\n【自定义系统提示词】\n{custom_prompt}"
                 
                 # 详细日志：系统提示词已应用
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"ResponseEngine: 详细日志 - 已应用自定义系统提示词到基础提示词")
             else:
                 # 详细日志：系统提示词未应用
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"ResponseEngine: 详细日志 - 未应用自定义系统提示词")
         
         return base_prompt
@@ -252,7 +254,7 @@ class ResponseEngine:
         logger.debug("ResponseEngine: 构建读空气提示词。")
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"ResponseEngine: 详细日志 - 读空气决策开始，事件: {event.get_sender_id()}, 群组: {event.get_group_id()}")
         
         # 构建读空气提示
@@ -262,7 +264,7 @@ class ResponseEngine:
         llm_response = await self._call_llm_for_air_reading(air_reading_prompt, event)
         
         # 检查是否启用详细日志
-        if self._is_detailed_logging():
+        if self._detailed_logging:
             logger.debug(f"ResponseEngine: 详细日志 - LLM读空气原始响应: {llm_response}")
         
         # 优化版本：直接处理LLM响应，不再使用复杂的标记处理
@@ -273,7 +275,7 @@ class ResponseEngine:
             logger.info(f"ResponseEngine: LLM决定跳过回复。")
             
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"ResponseEngine: 详细日志 - 检测到不回复标记")
             
             return {
@@ -288,7 +290,7 @@ class ResponseEngine:
             logger.info(f"ResponseEngine: LLM决定进行回复。")
             
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"ResponseEngine: 详细日志 - LLM决定回复，内容长度: {len(response_text)}")
             
             # LLM的回复就是直接要发送的内容
@@ -416,7 +418,7 @@ class ResponseEngine:
                     logger.debug(f"ResponseEngine: 直接传递模式，传递 {len(image_urls)} 张图片给多模态AI")
             
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"ResponseEngine: 详细日志 - 读空气提示词长度: {len(prompt)}")
                 logger.debug(f"ResponseEngine: 详细日志 - 图片URL数量: {len(image_urls)}")
                 logger.debug(f"ResponseEngine: 详细日志 - 提供商类型: {type(provider).__name__}")
@@ -428,7 +430,7 @@ class ResponseEngine:
             sys_prompt = self._compose_system_prompt_with_persona(base_sys_prompt, persona)
             
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"ResponseEngine: 详细日志 - 系统提示词长度: {len(sys_prompt)}")
                 logger.debug(f"ResponseEngine: 详细日志 - 人格信息: {persona}")
             
@@ -443,7 +445,7 @@ class ResponseEngine:
                 logger.info(f"ResponseEngine: LLM读空气调用成功。回复: {llm_response.completion_text.strip()}")
                 
                 # 检查是否启用详细日志
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"ResponseEngine: 详细日志 - LLM响应对象类型: {type(llm_response).__name__}")
                     logger.debug(f"ResponseEngine: 详细日志 - LLM响应内容长度: {len(llm_response.completion_text)}")
                 
@@ -452,7 +454,7 @@ class ResponseEngine:
                 logger.warning("ResponseEngine: LLM读空气调用成功，但返回内容为空。")
                 
                 # 检查是否启用详细日志
-                if self._is_detailed_logging():
+                if self._detailed_logging:
                     logger.debug(f"ResponseEngine: 详细日志 - LLM响应对象: {llm_response}")
                 
                 return ""
@@ -461,7 +463,7 @@ class ResponseEngine:
             logger.error(f"ResponseEngine: LLM 读空气调用过程中发生异常: {e}", exc_info=True)
             
             # 检查是否启用详细日志
-            if self._is_detailed_logging():
+            if self._detailed_logging:
                 logger.debug(f"ResponseEngine: 详细日志 - 异常详细信息: {str(e)}")
             
             return ""  # 出错时默认不回复，保证系统稳定性
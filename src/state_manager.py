@@ -11,21 +11,237 @@ __version__ = "V2.0.4"
 __author__ = "Him666233"
 __description__ = "状态管理器模块：负责插件状态的持久化存储"
 
+import array
+import asyncio
 import json
+import logging
+import mmap
 import os
+import queue
+import shutil
+import threading
 import time
-from typing import Dict, Any, Optional
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
 from pathlib import Path
+from urllib.parse import quote, unquote
 
 from astrbot.api import logger
 from astrbot.api.star import Context
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _encode_default(obj: Any) -> Any:
+    """序列化时将自定义映射（如 FloatTable）转换为普通字典"""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+def _dumps(obj: Any) -> bytes:
+    """将状态序列化为紧凑的JSON字节串（优先使用orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_encode_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_encode_default).encode('utf-8')
+
+
+def _loads(data: bytes) -> Any:
+    """从JSON字节串反序列化状态（优先使用orjson）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _read_msgpack_file(path: Path) -> Any:
+    """读取并解析msgpack状态分片"""
+    with open(path, 'rb') as f:
+        return msgpack.unpackb(f.read(), raw=False, strict_map_key=False)
+
+
+class FloatTable(MutableMapping):
+    """以并列数组存储的 字符串→浮点数 映射
+    
+    键列表、连续的C双精度数组与键到下标的索引三者并列，
+    数值不再逐个装箱为 float 对象，需要批量计算时可直接
+    通过 numpy.frombuffer(table.values, dtype=numpy.float64) 零复制访问。
+    """
+    
+    __slots__ = ("_ids", "values", "_index")
+    
+    def __init__(self, data: Optional[Mapping] = None):
+        self._ids: List[str] = []
+        self.values = array.array('d')
+        self._index: Dict[str, int] = {}
+        if data:
+            self.update(data)
+    
+    def __getitem__(self, key: str) -> float:
+        return self.values[self._index[key]]
+    
+    def __setitem__(self, key: str, value: float):
+        idx = self._index.get(key)
+        if idx is None:
+            # 先追加数值：非数值会在此抛出异常，三者保持一致
+            self.values.append(value)
+            self._index[key] = len(self._ids)
+            self._ids.append(key)
+        else:
+            self.values[idx] = value
+    
+    def __delitem__(self, key: str):
+        # 用末尾元素填补空位，保持数组紧凑
+        idx = self._index.pop(key)
+        last_key = self._ids.pop()
+        last_value = self.values.pop()
+        if idx < len(self._ids):
+            self._ids[idx] = last_key
+            self.values[idx] = last_value
+            self._index[last_key] = idx
+    
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ids)
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __repr__(self) -> str:
+        return f"FloatTable({self.copy()!r})"
+    
+    def copy(self) -> Dict[str, float]:
+        """复制为普通字典"""
+        return dict(zip(self._ids, self.values))
+
+
+# 快照中表示该顶层键已被删除的标记
+_DELETED = object()
+# 区分“键不存在”与“键存在但值为None”的标记
+_MISSING = object()
+# 可安全比较是否相等的不可变标量类型；容器可能已被调用方原地修改，相等不代表已记录
+_IMMUTABLE_SCALARS = (str, int, float, bool, type(None))
+
+
+def _is_unchanged(prev: Any, value: Any) -> bool:
+    """判断写入的值是否与当前值相同，可跳过记录（仅对不可变标量成立）"""
+    return type(prev) is type(value) and type(prev) in _IMMUTABLE_SCALARS and prev == value
+
+
+# 超过该大小的状态文件通过 mmap 读取，小文件直接读入更划算
+MMAP_READ_THRESHOLD = 64 * 1024
+
+
+def _read_json_file(path: Path) -> Any:
+    """读取并解析JSON状态文件，大文件直接从页缓存映射解析，避免额外复制"""
+    with open(path, 'rb') as f:
+        if orjson is None or os.fstat(f.fileno()).st_size <= MMAP_READ_THRESHOLD:
+            return _loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
+
+def _make_map_getter(state_key: str, doc: str):
+    """生成返回常驻顶层状态表的访问器"""
+    def getter(self) -> Dict[str, Any]:
+        return self._state_cache[state_key]
+    getter.__doc__ = doc
+    return getter
+
+
+def _make_map_setter(state_key: str, doc: str, log_message: str):
+    """生成设置状态表中单个条目的访问器，日志模板接收条目键和值两个参数"""
+    def setter(self, map_key: str, value: Any):
+        entries = self._state_cache[state_key]
+        if _is_unchanged(entries.get(map_key, _MISSING), value):
+            # 值未变化，无需记录
+            return
+        # 详细日志：设置状态表条目
+        if self._detailed_logging:
+            logger.debug(log_message, map_key, value)
+        entries[map_key] = value
+        self._record_set((state_key, map_key), value)
+    setter.__doc__ = doc
+    return setter
+
+
+def _make_map_remover(state_key: str, doc: str, log_message: str):
+    """生成删除状态表中单个条目的访问器，日志模板接收条目键一个参数"""
+    def remover(self, map_key: str):
+        entries = self._state_cache[state_key]
+        if map_key in entries:
+            # 详细日志：删除状态表条目
+            if self._detailed_logging:
+                logger.debug(log_message, map_key)
+            del entries[map_key]
+            self._record_delete((state_key, map_key))
+    remover.__doc__ = doc
+    return remover
+
+
+def _make_counter_incrementer(state_key: str, doc: str, log_message: str):
+    """生成将状态表中计数加一的访问器，日志模板接收条目键一个参数"""
+    def incrementer(self, map_key: str):
+        # 详细日志：增加计数
+        if self._detailed_logging:
+            logger.debug(log_message, map_key)
+        counts = self._state_cache[state_key]
+        count = counts[map_key] = counts.get(map_key, 0) + 1
+        self._record_set((state_key, map_key), count)
+    incrementer.__doc__ = doc
+    return incrementer
+
+
 class StateManager:
     """状态管理器 - 负责插件状态的持久化存储"""
     
+    # 状态变更后延迟全量写盘的合并窗口（秒）；每次变更已即时追加到日志，全量保存可以更稀疏
+    SAVE_DEBOUNCE_SECONDS = 30.0
+    # 日志累计多少条变更后立即压缩（全量保存并清除已封存的日志）
+    JOURNAL_COMPACT_THRESHOLD = 500
+    # 常驻的顶层状态表，加载后一次性创建，访问器直接返回同一对象
+    _TOP_LEVEL_KEYS = (
+        "interaction_modes",
+        "focus_targets",
+        "fatigue_data",
+        "conversation_counts",
+        "last_activity",
+        "user_impressions",
+        "group_umo_map",
+        "focus_response_counts",
+        "consecutive_responses",
+    )
+    # 每隔多少次保存刷新一次 state.backup 目录
+    BACKUP_EVERY_N_SAVES = 20
+    # 以数值为主的状态表，安装了msgpack时以二进制分片存储，其余分片保持JSON便于查看
+    _NUMERIC_KEYS = frozenset((
+        "fatigue_data",
+        "conversation_counts",
+        "focus_response_counts",
+        "consecutive_responses",
+        "last_activity",
+    ))
+    # 使用专用存储结构的顶层状态表
+    _MAP_TYPES = {"fatigue_data": FloatTable}
+    # 用户印象与每个群组的对话计数默认最多保留的用户数（配置项 max_tracked_users），超出时淘汰最久未访问的用户
+    DEFAULT_MAX_TRACKED_USERS = 5000
+    
     def __init__(self, context: Context, config: Any):
         self.context = context
         self.config = config
+        # 详细日志开关在初始化时计算一次，配置变更后通过 reload_config() 刷新
+        self._detailed_logging = self._compute_detailed_logging()
+        self._max_tracked_users = self._compute_max_tracked_users()
         
         # 使用AstrBot标准的数据目录获取方式
         try:
@@ -37,7 +253,7 @@ class StateManager:
                 raise AttributeError("StarTools.get_data_dir method not available")
         except (ImportError, AttributeError, Exception) as e:
             # 回退方案：使用配置中的数据目录
-            logger.debug(f"使用标准数据目录获取方式失败，使用回退方案: {e}")
+            logger.debug("使用标准数据目录获取方式失败，使用回退方案: %s", e)
             try:
                 data_dir_config = context.get_config().get("data_dir", "data")
                 if os.path.isabs(data_dir_config):
@@ -48,7 +264,7 @@ class StateManager:
                     self.data_dir = plugin_root / data_dir_config
             except Exception as config_error:
                 # 最终回退方案：使用默认数据目录
-                logger.debug(f"配置数据目录获取失败，使用默认目录: {config_error}")
+                logger.debug("配置数据目录获取失败，使用默认目录: %s", config_error)
                 plugin_root = Path(__file__).parent.parent
                 self.data_dir = plugin_root / "data"
         
@@ -57,18 +273,54 @@ class StateManager:
         # 确保数据目录存在
         self.plugin_data_dir.mkdir(parents=True, exist_ok=True)
         
-        # 状态文件路径
+        # 状态分片目录：每个顶层状态键一个文件，写盘时只重写有变更的分片
+        self.state_dir = self.plugin_data_dir / "state"
+        self.state_dir.mkdir(exist_ok=True)
+        self.backup_dir = self.plugin_data_dir / "state.backup"
+        # 旧版单文件状态，加载后迁移为分片
         self.state_file = self.plugin_data_dir / "state.json"
+        # 增量变更日志路径（JSON Lines，每行一次变更）
+        self.journal_file = self.plugin_data_dir / "state.log"
         
         # 内存中的状态
         self._state_cache: Dict[str, Any] = {}
         
+        # 写盘合并：脏标记与待执行的延迟保存
+        self._dirty = False
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._save_count = 0
+        self._journal_ops = 0
+        # 自上次快照以来有变更的顶层键；为True时下次快照重写全部分片
+        self._dirty_keys: set = set()
+        self._rewrite_all = False
+        # 写盘线程写入失败时会置位 _rewrite_all，与快照时的读取并清除用该锁互斥
+        self._rewrite_lock = threading.Lock()
+        # 有快照写盘失败且尚未被全量重写覆盖时为True，期间保留全部日志分段（仅在写盘锁内访问）
+        self._write_failed = False
+        
+        # 后台写盘：调用方线程只复制有变更的顶层状态表形成快照，序列化、写入、fsync 与替换在写盘线程完成
+        # 每次快照对应一个日志分段编号，写盘时跳过比已写入快照更旧的快照
+        self._journal_generation = 0
+        self._written_generation = 0
+        self._write_lock = threading.Lock()
+        self._save_queue: "queue.Queue[Optional[Tuple[Dict[str, Any], int, bool]]]" = queue.Queue(maxsize=1)
+        self._save_thread = threading.Thread(target=self._save_worker, name="StateManagerSaver", daemon=True)
+        
+        # 各分片文件大小在读写时顺带记录，统计时无需再次 stat
+        self._shard_sizes: Dict[str, int] = {}
+        # 统计信息缓存，状态变更时失效
+        self._statistics: Optional[Dict[str, Any]] = None
+        
         # 加载已有状态
         self._load_state()
+        self._journal = open(self.journal_file, 'ab', buffering=0)
+        self._replay_journal()
+        self._ensure_top_level_keys()
+        self._save_thread.start()
         
         logger.info(f"状态管理器初始化完成，数据目录: {self.plugin_data_dir}")
     
-    def _is_detailed_logging(self) -> bool:
+    def _compute_detailed_logging(self) -> bool:
         """检查是否启用详细日志"""
         try:
             # 检查配置中的enable_detailed_logging开关
@@ -78,292 +330,652 @@ class StateManager:
         except Exception:
             return False
     
+    def _compute_max_tracked_users(self) -> int:
+        """读取用户印象与对话计数最多保留的用户数"""
+        try:
+            if isinstance(self.config, dict):
+                value = self.config.get("max_tracked_users", self.DEFAULT_MAX_TRACKED_USERS)
+            else:
+                value = getattr(self.config, "max_tracked_users", self.DEFAULT_MAX_TRACKED_USERS) if self.config else self.DEFAULT_MAX_TRACKED_USERS
+            return max(1, int(value))
+        except Exception:
+            return self.DEFAULT_MAX_TRACKED_USERS
+    
+    def reload_config(self, config: Any = None):
+        """重新读取配置（可传入新配置），刷新缓存的详细日志开关与用户数上限"""
+        if config is not None:
+            self.config = config
+        self._detailed_logging = self._compute_detailed_logging()
+        self._max_tracked_users = self._compute_max_tracked_users()
+    
+    def _shard_path(self, key: str) -> Path:
+        """获取顶层状态键对应的分片文件路径（键名编码为安全的文件名）"""
+        suffix = ".msgpack" if msgpack is not None and key in self._NUMERIC_KEYS else ".json"
+        return self.state_dir / f"{quote(key, safe='')}{suffix}"
+    
+    def _remove_shard(self, key: str):
+        """删除顶层状态键对应的分片文件（两种格式都清理）"""
+        name = quote(key, safe='')
+        (self.state_dir / f"{name}.json").unlink(missing_ok=True)
+        (self.state_dir / f"{name}.msgpack").unlink(missing_ok=True)
+    
     def _load_state(self):
-        """从文件加载状态"""
+        """从分片目录加载状态，存在旧版单文件状态时先加载它并安排迁移"""
+        self._state_cache = {}
         if self.state_file.exists():
             try:
-                with open(self.state_file, 'r', encoding='utf-8') as f:
-                    self._state_cache = json.load(f)
-                # 详细日志：状态加载成功
-                if self._is_detailed_logging():
-                    logger.debug(f"[状态管理器] 状态加载成功 - 文件: {self.state_file}, 状态键数量: {len(self._state_cache)}")
-                logger.info(f"已从 {self.state_file} 加载状态数据")
+                self._state_cache = _read_json_file(self.state_file)
+                # 迁移：首次快照写出全部分片后删除旧文件
+                self._rewrite_all = True
+                logger.info(f"已从 {self.state_file} 加载旧版状态数据，将迁移为分片存储")
             except Exception as e:
                 logger.error(f"加载状态文件失败: {e}")
                 self._state_cache = {}
+        
+        shard_paths = list(self.state_dir.glob("*.json"))
+        if msgpack is not None:
+            # 后加载的msgpack分片优先，覆盖格式切换前遗留的同名JSON分片
+            shard_paths.extend(self.state_dir.glob("*.msgpack"))
+        elif any(self.state_dir.glob("*.msgpack")):
+            logger.warning("状态目录中存在msgpack分片，但未安装msgpack，已跳过这些分片")
+        for shard_path in shard_paths:
+            key = unquote(shard_path.stem)
+            try:
+                if shard_path.suffix == ".msgpack":
+                    self._state_cache[key] = _read_msgpack_file(shard_path)
+                else:
+                    self._state_cache[key] = _read_json_file(shard_path)
+                self._shard_sizes[key] = shard_path.stat().st_size
+            except Exception as e:
+                logger.error(f"加载状态分片失败: {shard_path}, {e}")
+        
+        if self._state_cache:
+            # 详细日志：状态加载成功
+            if self._detailed_logging and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[状态管理器] 状态加载成功 - 目录: %s, 状态键数量: %s", self.state_dir, len(self._state_cache))
+            logger.info(f"已从 {self.state_dir} 加载状态数据")
         else:
             # 详细日志：状态文件不存在
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 状态文件不存在 - 文件: {self.state_file}, 使用空状态")
+            if self._detailed_logging:
+                logger.debug("[状态管理器] 状态文件不存在 - 目录: %s, 使用空状态", self.state_dir)
             logger.info("状态文件不存在，使用空状态")
-            self._state_cache = {}
     
-    def _save_state(self):
-        """保存状态到文件"""
+    def _ensure_top_level_keys(self):
+        """确保所有常驻顶层状态表都已存在，并使用各自的存储结构"""
+        for key in self._TOP_LEVEL_KEYS:
+            self._state_cache.setdefault(key, {})
+        for key in self._MAP_TYPES:
+            self._state_cache[key] = self._coerce_map(key, self._state_cache[key])
+    
+    def _coerce_map(self, key: str, value: Any) -> Any:
+        """将顶层状态表转换为其专用存储结构（如有）"""
+        map_type = self._MAP_TYPES.get(key)
+        if map_type is None or isinstance(value, map_type) or not isinstance(value, Mapping):
+            return value
+        return map_type(value)
+    
+    def _journal_segment(self, generation: int) -> Path:
+        """获取指定编号的已封存日志分段路径"""
+        return self.plugin_data_dir / f"state.log.{generation}"
+    
+    def _journal_segments(self) -> List[Tuple[int, Path]]:
+        """按编号顺序列出已封存但尚未被快照覆盖的日志分段"""
+        segments = []
+        for path in self.plugin_data_dir.glob("state.log.*"):
+            suffix = path.name.rsplit(".", 1)[-1]
+            if suffix.isdigit():
+                segments.append((int(suffix), path))
+        segments.sort()
+        return segments
+    
+    def _replay_journal(self):
+        """将已封存的日志分段与当前增量日志中的变更依次重放到已加载的状态上"""
+        segments = self._journal_segments()
+        if segments:
+            self._journal_generation = segments[-1][0]
+            self._written_generation = self._journal_generation
+        
+        replayed = 0
+        for journal_path in [path for _, path in segments] + [self.journal_file]:
+            try:
+                with open(journal_path, 'rb') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        try:
+                            entry = _loads(line)
+                        except Exception:
+                            # 末尾可能是崩溃时未写完的半行，之后的内容不再可信
+                            logger.warning(f"状态日志存在损坏的记录，已停止重放: {journal_path}")
+                            break
+                        self._apply_journal_entry(entry)
+                        replayed += 1
+            except Exception as e:
+                logger.error(f"重放状态日志失败: {e}")
+        
+        # 详细日志：状态日志重放完成
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 状态日志重放完成 - 分段数量: %s, 变更数量: %s", len(segments) + 1, replayed)
+        if replayed or segments or self._rewrite_all:
+            # 立即压缩（或完成旧版状态迁移），使分片反映最新状态
+            self._save_state()
+    
+    def _apply_journal_entry(self, entry: Dict[str, Any]):
+        """应用一条日志记录：op为s表示设置，d表示删除，p为从顶层键开始的路径"""
+        path = entry["p"]
+        self._dirty_keys.add(path[0])
+        target = self._state_cache
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        if entry["op"] == "s":
+            target[path[-1]] = entry["v"]
+        else:
+            target.pop(path[-1], None)
+    
+    def _append_journal(self, entry: Dict[str, Any]):
+        """向增量日志追加一条变更记录"""
+        self._dirty_keys.add(entry["p"][0])
+        try:
+            self._journal.write(_dumps(entry) + b"\n")
+            self._journal_ops += 1
+        except Exception as e:
+            logger.error(f"写入状态日志失败: {e}")
+    
+    def _record_set(self, path: Sequence[str], value: Any):
+        """记录一次设置操作并标记状态已变更"""
+        self._append_journal({"op": "s", "p": list(path), "v": value})
+        self._mark_dirty()
+    
+    def _record_delete(self, path: Sequence[str]):
+        """记录一次删除操作并标记状态已变更"""
+        self._append_journal({"op": "d", "p": list(path)})
+        self._mark_dirty()
+    
+    def _lru_set(self, entries: Dict[str, Any], path: Sequence[str], value: Any):
+        """按LRU顺序写入条目（字典保持插入顺序，最近访问的在末尾），超出上限时淘汰最旧的条目
+        
+        只追加日志，调用方负责标记状态已变更。
+        """
+        key = path[-1]
+        entries.pop(key, None)
+        entries[key] = value
+        self._append_journal({"op": "s", "p": list(path), "v": value})
+        while len(entries) > self._max_tracked_users:
+            evicted = next(iter(entries))
+            del entries[evicted]
+            self._append_journal({"op": "d", "p": [*path[:-1], evicted]})
+    
+    def _rotate_journal(self) -> int:
+        """封存当前增量日志为新的分段并返回其编号，之后的变更写入新的日志"""
+        self._journal_generation += 1
+        generation = self._journal_generation
+        self._journal.close()
+        os.replace(self.journal_file, self._journal_segment(generation))
+        self._journal = open(self.journal_file, 'ab', buffering=0)
+        self._journal_ops = 0
+        return generation
+    
+    def _snapshot_state(self) -> Optional[Tuple[Dict[str, Any], int, bool]]:
+        """生成有变更分片的写时复制快照并封存对应的日志分段，失败时返回None
+        
+        快照只复制有变更的顶层状态表本身（开销与条目数成正比，无需序列化），
+        之后对状态表的增删不会影响快照；更深层的改动即使被快照带上，
+        也会在恢复时由之后的日志重放覆盖为最新值。
+        返回值依次为 分片快照、日志分段编号、是否重写全部分片。
+        """
+        with self._rewrite_lock:
+            full = self._rewrite_all
+            self._rewrite_all = False
         try:
+            keys = list(self._state_cache) if full else list(self._dirty_keys)
             # 详细日志：开始保存状态
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 开始保存状态 - 文件: {self.state_file}, 状态键数量: {len(self._state_cache)}")
-            
-            # 创建备份
-            if self.state_file.exists():
-                backup_file = self.state_file.with_suffix('.json.backup')
-                backup_file.write_text(self.state_file.read_text(encoding='utf-8'), encoding='utf-8')
-                # 详细日志：备份创建成功
-                if self._is_detailed_logging():
-                    logger.debug(f"[状态管理器] 备份创建成功 - 备份文件: {backup_file}")
-            
-            # 保存新状态
-            with open(self.state_file, 'w', encoding='utf-8') as f:
-                json.dump(self._state_cache, f, ensure_ascii=False, indent=2)
-            
-            # 详细日志：状态保存成功
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 状态保存成功 - 文件: {self.state_file}")
-            
-            logger.debug(f"状态已保存到 {self.state_file}")
+            if self._detailed_logging and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[状态管理器] 开始保存状态 - 目录: %s, 变更分片数量: %s, 全量: %s", self.state_dir, len(keys), full)
+            shards = {}
+            for key in keys:
+                value = self._state_cache.get(key, _DELETED)
+                shards[key] = value.copy() if isinstance(value, (dict, FloatTable)) else value
+            self._dirty_keys = set()
+            return shards, self._rotate_journal(), full
         except Exception as e:
             logger.error(f"保存状态文件失败: {e}")
-            # 详细日志：状态保存失败
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 状态保存失败 - 错误: {e}")
+            if full:
+                # 快照未生成，保留全量重写请求
+                with self._rewrite_lock:
+                    self._rewrite_all = True
+            return None
+    
+    def _save_state(self):
+        """同步保存状态到文件（仅在后台写盘线程启动前使用）"""
+        snapshot = self._snapshot_state()
+        if snapshot is not None:
+            self._write_state_shards(*snapshot)
+    
+    def _schedule_save(self):
+        """封存状态快照并交给后台线程写盘，尚未写入的旧快照合并进新快照"""
+        snapshot = self._snapshot_state()
+        if snapshot is None:
+            return
+        try:
+            pending_shards, _, pending_full = self._save_queue.get_nowait()
+            self._save_queue.task_done()
+            shards, generation, full = snapshot
+            if not full:
+                pending_shards.update(shards)
+                shards = pending_shards
+            snapshot = (shards, generation, full or pending_full)
+        except queue.Empty:
+            pass
+        self._save_queue.put_nowait(snapshot)
+    
+    def _save_worker(self):
+        """后台写盘线程"""
+        while True:
+            snapshot = self._save_queue.get()
+            try:
+                if snapshot is None:
+                    return
+                self._write_state_shards(*snapshot)
+            finally:
+                self._save_queue.task_done()
+    
+    def _write_state_shards(self, shards: Dict[str, Any], generation: int, full: bool):
+        """将快照中的分片序列化写入文件，并清除已被该快照覆盖的日志分段
+        
+        某次写盘失败后，其分片变更只保存在对应的日志分段中，
+        在全量重写成功之前不清除任何日志分段，避免之后的部分快照把它们一并删除。
+        """
+        with self._write_lock:
+            if generation <= self._written_generation:
+                # 已有更新的快照落盘
+                return
+            tmp_file = None
+            try:
+                # 定期创建备份：替换前为旧分片建立硬链接，无需复制内容
+                if self._save_count % self.BACKUP_EVERY_N_SAVES == 0 and self._shard_sizes:
+                    self._backup_state_dir()
+                self._save_count += 1
+                
+                for key, value in shards.items():
+                    if value is _DELETED:
+                        self._remove_shard(key)
+                        self._shard_sizes.pop(key, None)
+                        continue
+                    shard_path = self._shard_path(key)
+                    if shard_path.suffix == ".msgpack":
+                        data = msgpack.packb(value, use_bin_type=True, default=_encode_default)
+                        stale_path = shard_path.with_suffix(".json")
+                    else:
+                        data = _dumps(value)
+                        stale_path = shard_path.with_suffix(".msgpack")
+                    # 先写入临时文件，再原子替换，避免写入中途崩溃导致分片损坏
+                    tmp_file = shard_path.with_name(shard_path.name + '.tmp')
+                    with open(tmp_file, 'wb') as f:
+                        f.write(data)
+                        f.flush()
+                        os.fsync(f.fileno())
+                        self._shard_sizes[key] = f.tell()
+                    os.replace(tmp_file, shard_path)
+                    tmp_file = None
+                    if key in self._NUMERIC_KEYS:
+                        # 清理格式切换前遗留的另一种格式分片
+                        stale_path.unlink(missing_ok=True)
+                
+                if full:
+                    # 全量重写：删除已不在状态中的分片，并移除已迁移的旧版状态文件
+                    for key in [key for key in self._shard_sizes if key not in shards]:
+                        self._remove_shard(key)
+                        del self._shard_sizes[key]
+                    self.state_file.unlink(missing_ok=True)
+                    self._write_failed = False
+                
+                self._written_generation = generation
+                self._statistics = None
+                
+                if not self._write_failed:
+                    # 状态已落盘，清除已被快照覆盖的日志分段
+                    for segment_generation, segment_path in self._journal_segments():
+                        if segment_generation <= generation:
+                            segment_path.unlink(missing_ok=True)
+                
+                # 详细日志：状态保存成功
+                if self._detailed_logging:
+                    logger.debug("[状态管理器] 状态保存成功 - 目录: %s, 分片数量: %s", self.state_dir, len(shards))
+                
+                logger.debug("状态已保存到 %s", self.state_dir)
+            except Exception as e:
+                logger.error(f"保存状态文件失败: {e}")
+                if tmp_file is not None:
+                    tmp_file.unlink(missing_ok=True)
+                # 本次快照未完整落盘：保留日志分段，并让下次快照重写全部分片
+                self._write_failed = True
+                with self._rewrite_lock:
+                    self._rewrite_all = True
+                # 详细日志：状态保存失败
+                if self._detailed_logging:
+                    logger.debug("[状态管理器] 状态保存失败 - 错误: %s", e)
+    
+    def _backup_state_dir(self):
+        """将当前全部分片备份到 state.backup 目录"""
+        shutil.rmtree(self.backup_dir, ignore_errors=True)
+        self.backup_dir.mkdir()
+        for shard_path in self.state_dir.iterdir():
+            if shard_path.suffix not in (".json", ".msgpack"):
+                continue
+            backup_file = self.backup_dir / shard_path.name
+            try:
+                os.link(shard_path, backup_file)
+            except OSError:
+                # 不支持硬链接的文件系统回退为内核级复制
+                shutil.copyfile(shard_path, backup_file)
+        # 详细日志：备份创建成功
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 备份创建成功 - 备份目录: %s", self.backup_dir)
+    
+    def _mark_dirty(self):
+        """标记状态已变更，并安排一次延迟保存"""
+        self._dirty = True
+        self._statistics = None
+        if self._journal_ops >= self.JOURNAL_COMPACT_THRESHOLD:
+            # 日志过长时立即压缩
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+            self._flush_if_dirty()
+            return
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有运行中的事件循环（如初始化或同步调用），直接安排保存
+            self._flush_if_dirty()
+            return
+        self._flush_handle = loop.call_later(self.SAVE_DEBOUNCE_SECONDS, self._flush_if_dirty)
+    
+    def _flush_if_dirty(self):
+        """如有未保存的变更则安排后台写盘"""
+        self._flush_handle = None
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._schedule_save()
+    
+    def _submit_pending(self):
+        """取消待执行的延迟保存，立即将未写盘的变更交给后台线程（不等待写盘完成）"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._dirty or self._dirty_keys or self._rewrite_all:
+            self._dirty = False
+            self._schedule_save()
+    
+    def flush(self):
+        """立即保存所有未写盘的变更，并等待后台写盘完成（阻塞调用线程）"""
+        self._submit_pending()
+        self._save_queue.join()
+    
+    async def aflush(self):
+        """flush() 的异步版本，在线程中等待后台写盘完成，不阻塞事件循环"""
+        self._submit_pending()
+        await asyncio.to_thread(self._save_queue.join)
+    
+    def _stop_saver(self):
+        """停止后台写盘线程并关闭增量日志"""
+        self._save_queue.put(None)
+        self._save_thread.join()
+        self._journal.close()
+    
+    def close(self):
+        """保存所有变更并停止后台写盘线程"""
+        self.flush()
+        self._stop_saver()
+    
+    async def aclose(self):
+        """close() 的异步版本，供插件终止时在事件循环中调用"""
+        await self.aflush()
+        await asyncio.to_thread(self._stop_saver)
     
     def get(self, key: str, default: Any = None) -> Any:
         """获取状态值"""
         value = self._state_cache.get(key, default)
         # 详细日志：获取状态值
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 获取状态 - 键: {key}, 值: {value}, 默认值: {default}")
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 获取状态 - 键: %s, 值: %s, 默认值: %s", key, value, default)
         return value
     
     def set(self, key: str, value: Any):
-        """设置状态值"""
+        """设置状态值（与当前的不可变标量值相等时不记录变更）"""
+        # 字典等容器即使相等也可能是在原地修改当前对象后传入的新副本，仍需记录
+        if _is_unchanged(self._state_cache.get(key, _MISSING), value):
+            return
         # 详细日志：设置状态值
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 设置状态 - 键: {key}, 值: {value}")
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 设置状态 - 键: %s, 值: %s", key, value)
+        value = self._coerce_map(key, value)
         self._state_cache[key] = value
-        self._save_state()
+        self._record_set((key,), value)
     
     def update(self, key: str, value: Any, save: bool = True):
-        """更新状态值（可选择是否立即保存）"""
+        """更新状态值
+        
+        save=True 时写入增量日志；save=False 时不写日志，只标记分片已变更并安排延迟保存，
+        适合频繁变化、丢失最近一次变更也无妨的状态。
+        """
         # 详细日志：更新状态值
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 更新状态 - 键: {key}, 值: {value}, 立即保存: {save}")
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 更新状态 - 键: %s, 值: %s, 立即保存: %s", key, value, save)
+        value = self._coerce_map(key, value)
         self._state_cache[key] = value
+        self._statistics = None
         if save:
-            self._save_state()
+            self._record_set((key,), value)
+        else:
+            # 不写日志，由延迟保存的快照写入对应分片
+            self._dirty_keys.add(key)
+            self._mark_dirty()
     
     def delete(self, key: str):
         """删除状态值"""
         if key in self._state_cache:
             # 详细日志：删除状态值
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 删除状态 - 键: {key}")
+            if self._detailed_logging:
+                logger.debug("[状态管理器] 删除状态 - 键: %s", key)
             del self._state_cache[key]
-            self._save_state()
+            if key in self._TOP_LEVEL_KEYS:
+                self._state_cache[key] = self._coerce_map(key, {})
+            self._record_delete((key,))
     
-    def get_interaction_modes(self) -> Dict[str, str]:
-        """获取交互模式状态"""
-        return self.get("interaction_modes", {})
+    # 以下按键生成的访问器直接访问对应的常驻状态表
+    get_interaction_modes = _make_map_getter("interaction_modes", "获取交互模式状态")
+    set_interaction_mode = _make_map_setter(
+        "interaction_modes", "设置交互模式",
+        "[状态管理器] 设置交互模式 - 群组: %s, 模式: %s")
     
-    def set_interaction_mode(self, group_id: str, mode: str):
-        """设置交互模式"""
-        # 详细日志：设置交互模式
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 设置交互模式 - 群组: {group_id}, 模式: {mode}")
-        modes = self.get_interaction_modes()
-        modes[group_id] = mode
-        self.set("interaction_modes", modes)
-    
-    def get_focus_targets(self) -> Dict[str, str]:
-        """获取专注聊天目标"""
-        return self.get("focus_targets", {})
-    
-    def set_focus_target(self, group_id: str, user_id: str):
-        """设置专注聊天目标"""
-        # 详细日志：设置专注聊天目标
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 设置专注聊天目标 - 群组: {group_id}, 用户: {user_id}")
-        targets = self.get_focus_targets()
-        targets[group_id] = user_id
-        self.set("focus_targets", targets)
-    
-    def remove_focus_target(self, group_id: str):
-        """移除专注聊天目标"""
-        targets = self.get_focus_targets()
-        if group_id in targets:
-            # 详细日志：移除专注聊天目标
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 移除专注聊天目标 - 群组: {group_id}")
-            del targets[group_id]
-            self.set("focus_targets", targets)
-
-    def get_group_umo_map(self) -> Dict[str, str]:
-        """获取群组会话标识映射（unified_msg_origin 映射）"""
-        return self.get("group_umo_map", {})
-
-    def set_group_umo(self, group_id: str, umo: str):
-        """记录群组的 unified_msg_origin，供主动消息发送使用"""
-        # 详细日志：设置群组UMO
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 设置群组UMO - 群组: {group_id}, UMO: {umo}")
-        mapping = self.get_group_umo_map()
-        mapping[group_id] = umo
-        self.set("group_umo_map", mapping)
+    get_focus_targets = _make_map_getter("focus_targets", "获取专注聊天目标")
+    set_focus_target = _make_map_setter(
+        "focus_targets", "设置专注聊天目标",
+        "[状态管理器] 设置专注聊天目标 - 群组: %s, 用户: %s")
+    remove_focus_target = _make_map_remover(
+        "focus_targets", "移除专注聊天目标",
+        "[状态管理器] 移除专注聊天目标 - 群组: %s")
+    clear_focus_target = _make_map_remover(
+        "focus_targets", "清除专注聊天目标",
+        "[状态管理器] 清除专注聊天目标 - 群组: %s")
+
+    get_group_umo_map = _make_map_getter("group_umo_map", "获取群组会话标识映射（unified_msg_origin 映射）")
+    set_group_umo = _make_map_setter(
+        "group_umo_map", "记录群组的 unified_msg_origin，供主动消息发送使用",
+        "[状态管理器] 设置群组UMO - 群组: %s, UMO: %s")
 
     def get_group_umo(self, group_id: str) -> Optional[str]:
         """获取群组的 unified_msg_origin"""
         return self.get_group_umo_map().get(group_id)
     
-    def get_fatigue_data(self) -> Dict[str, float]:
-        """获取疲劳度数据"""
-        return self.get("fatigue_data", {})
-    
-    def update_fatigue(self, user_id: str, fatigue_value: float):
-        """更新疲劳度"""
-        # 详细日志：更新疲劳度
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 更新疲劳度 - 用户: {user_id}, 疲劳值: {fatigue_value:.3f}")
-        fatigue_data = self.get_fatigue_data()
-        fatigue_data[user_id] = fatigue_value
-        self.set("fatigue_data", fatigue_data)
+    get_fatigue_data = _make_map_getter("fatigue_data", "获取疲劳度数据")
+    update_fatigue = _make_map_setter(
+        "fatigue_data", "更新疲劳度",
+        "[状态管理器] 更新疲劳度 - 用户: %s, 疲劳值: %.3f")
     
-    def get_conversation_counts(self) -> Dict[str, Dict[str, int]]:
-        """获取对话计数"""
-        return self.get("conversation_counts", {})
+    get_conversation_counts = _make_map_getter("conversation_counts", "获取对话计数")
     
     def increment_conversation_count(self, group_id: str, user_id: str):
         """增加对话计数"""
         # 详细日志：增加对话计数
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 增加对话计数 - 群组: {group_id}, 用户: {user_id}")
-        counts = self.get_conversation_counts()
-        if group_id not in counts:
-            counts[group_id] = {}
-        counts[group_id][user_id] = counts[group_id].get(user_id, 0) + 1
-        self.set("conversation_counts", counts)
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 增加对话计数 - 群组: %s, 用户: %s", group_id, user_id)
+        group_counts = self.get_conversation_counts().setdefault(group_id, {})
+        self._lru_set(group_counts, ("conversation_counts", group_id, user_id), group_counts.get(user_id, 0) + 1)
+        self._mark_dirty()
     
     def get_last_activity(self, key: str) -> float:
         """获取指定键的最后活动时间"""
-        value = self.get("last_activity", {}).get(key, 0.0)
+        value = self._state_cache["last_activity"].get(key, 0.0)
         # 详细日志：获取最后活动时间
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 获取最后活动时间 - 键: {key}, 值: {value}")
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 获取最后活动时间 - 键: %s, 值: %s", key, value)
         return value
 
-    def update_last_activity(self, key: str, timestamp: float = None):
-        """更新最后活动时间"""
+    def update_last_activity(self, key: str, timestamp: float = None, save: bool = False):
+        """更新最后活动时间
+        
+        活动时间只是近似值，默认只更新内存并随下一次快照写盘，不写日志也不触发保存；
+        需要立即持久化时传入 save=True。
+        """
         if timestamp is None:
             timestamp = time.time()
         # 详细日志：更新最后活动时间
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 更新最后活动时间 - 键: {key}, 时间戳: {timestamp}")
-        activity = self.get("last_activity", {})
-        activity[key] = timestamp
-        self.set("last_activity", activity)
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 更新最后活动时间 - 键: %s, 时间戳: %s, 立即保存: %s", key, timestamp, save)
+        self._state_cache["last_activity"][key] = timestamp
+        if save:
+            self._record_set(("last_activity", key), timestamp)
+        else:
+            self._dirty_keys.add("last_activity")
+
+    def apply_updates(self, group_id: str, user_id: str, current_time: float = None, reset_consecutive: bool = False):
+        """批量更新交互状态（活动时间、对话计数、连续回复计数），仅保存一次"""
+        if current_time is None:
+            current_time = time.time()
+        # 详细日志：批量更新交互状态
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 批量更新交互状态 - 群组: %s, 用户: %s, 时间戳: %s, 重置连续回复: %s", group_id, user_id, current_time, reset_consecutive)
+        
+        # 更新最后活动时间（仅内存，随下一次快照写盘）
+        activity = self._state_cache["last_activity"]
+        activity[group_id] = current_time
+        activity[user_id] = current_time
+        self._dirty_keys.add("last_activity")
+        
+        # 更新对话计数
+        group_counts = self.get_conversation_counts().setdefault(group_id, {})
+        self._lru_set(group_counts, ("conversation_counts", group_id, user_id), group_counts.get(user_id, 0) + 1)
+        
+        # 重置连续回复计数
+        if reset_consecutive:
+            responses = self.get_consecutive_responses()
+            if responses.get(group_id, 0) != 0:
+                responses[group_id] = 0
+                self._append_journal({"op": "s", "p": ["consecutive_responses", group_id], "v": 0})
+        
+        self._mark_dirty()
 
     def get_user_impression(self, user_id: str) -> Dict[str, Any]:
         """获取用户印象"""
-        impression = self.get("user_impressions", {}).get(user_id, {})
+        impressions = self._state_cache["user_impressions"]
+        impression = impressions.pop(user_id, None)
+        if impression is None:
+            impression = {}
+        else:
+            # 移到末尾，标记为最近访问
+            impressions[user_id] = impression
         # 详细日志：获取用户印象
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 获取用户印象 - 用户: {user_id}, 印象数据: {len(impression)} 个字段")
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 获取用户印象 - 用户: %s, 印象数据: %s 个字段", user_id, len(impression))
         return impression
 
+    def set_user_impression(self, user_id: str, impression: Dict[str, Any]):
+        """设置用户印象，超出上限时淘汰最久未访问的用户"""
+        # 详细日志：设置用户印象
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 设置用户印象 - 用户: %s, 印象数据: %s 个字段", user_id, len(impression))
+        self._lru_set(self._state_cache["user_impressions"], ("user_impressions", user_id), impression)
+        self._mark_dirty()
+
     def get_focus_target(self, group_id: str) -> Optional[str]:
         """获取专注聊天目标"""
         target = self.get_focus_targets().get(group_id)
         # 详细日志：获取专注聊天目标
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 获取专注聊天目标 - 群组: {group_id}, 目标: {target}")
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 获取专注聊天目标 - 群组: %s, 目标: %s", group_id, target)
         return target
 
-    def clear_focus_target(self, group_id: str):
-        """清除专注聊天目标"""
-        targets = self.get_focus_targets()
-        if group_id in targets:
-            # 详细日志：清除专注聊天目标
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 清除专注聊天目标 - 群组: {group_id}")
-            del targets[group_id]
-            self.set("focus_targets", targets)
-
     def get_focus_response_count(self, group_id: str) -> int:
         """获取专注聊天回复计数"""
-        count = self.get("focus_response_counts", {}).get(group_id, 0)
+        count = self._state_cache["focus_response_counts"].get(group_id, 0)
         # 详细日志：获取专注聊天回复计数
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 获取专注聊天回复计数 - 群组: {group_id}, 计数: {count}")
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 获取专注聊天回复计数 - 群组: %s, 计数: %s", group_id, count)
         return count
 
-    def increment_focus_response_count(self, group_id: str):
-        """增加专注聊天回复计数"""
-        # 详细日志：增加专注聊天回复计数
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 增加专注聊天回复计数 - 群组: {group_id}")
-        counts = self.get("focus_response_counts", {})
-        counts[group_id] = counts.get(group_id, 0) + 1
-        self.set("focus_response_counts", counts)
-
-    def clear_focus_response_count(self, group_id: str):
-        """清除专注聊天回复计数"""
-        counts = self.get("focus_response_counts", {})
-        if group_id in counts:
-            # 详细日志：清除专注聊天回复计数
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 清除专注聊天回复计数 - 群组: {group_id}")
-            del counts[group_id]
-            self.set("focus_response_counts", counts)
-    
-    def get_consecutive_responses(self) -> Dict[str, int]:
-        """获取连续回复计数"""
-        return self.get("consecutive_responses", {})
-    
-    def increment_consecutive_response(self, group_id: str):
-        """增加连续回复计数"""
-        # 详细日志：增加连续回复计数
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 增加连续回复计数 - 群组: {group_id}")
-        responses = self.get_consecutive_responses()
-        responses[group_id] = responses.get(group_id, 0) + 1
-        self.set("consecutive_responses", responses)
+    increment_focus_response_count = _make_counter_incrementer(
+        "focus_response_counts", "增加专注聊天回复计数",
+        "[状态管理器] 增加专注聊天回复计数 - 群组: %s")
+    clear_focus_response_count = _make_map_remover(
+        "focus_response_counts", "清除专注聊天回复计数",
+        "[状态管理器] 清除专注聊天回复计数 - 群组: %s")
+    
+    get_consecutive_responses = _make_map_getter("consecutive_responses", "获取连续回复计数")
+    increment_consecutive_response = _make_counter_incrementer(
+        "consecutive_responses", "增加连续回复计数",
+        "[状态管理器] 增加连续回复计数 - 群组: %s")
     
     def reset_consecutive_response(self, group_id: str):
         """重置连续回复计数"""
         responses = self.get_consecutive_responses()
-        if group_id in responses:
+        if responses.get(group_id, 0) != 0:
             # 详细日志：重置连续回复计数
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 重置连续回复计数 - 群组: {group_id}")
+            if self._detailed_logging:
+                logger.debug("[状态管理器] 重置连续回复计数 - 群组: %s", group_id)
             responses[group_id] = 0
-            self.set("consecutive_responses", responses)
+            self._record_set(("consecutive_responses", group_id), 0)
     
     def get_statistics(self) -> Dict[str, Any]:
-        """获取统计信息"""
-        return {
-            "interaction_modes_count": len(self.get_interaction_modes()),
-            "focus_targets_count": len(self.get_focus_targets()),
-            "fatigue_users_count": len(self.get_fatigue_data()),
-            "conversation_groups_count": len(self.get_conversation_counts()),
-            "last_activity_count": len(self.get("last_activity", {})),
-            "consecutive_responses_count": len(self.get_consecutive_responses()),
-            "state_file": str(self.state_file),
-            "state_file_exists": self.state_file.exists(),
-            "state_file_size": self.state_file.stat().st_size if self.state_file.exists() else 0
-        }
+        """获取统计信息
+        
+        只读取内存中的状态，不等待写盘，可在事件循环中直接调用；
+        文件信息为最近一次落盘时记录的值。
+        """
+        if self._statistics is None:
+            self._statistics = {
+                "interaction_modes_count": len(self.get_interaction_modes()),
+                "focus_targets_count": len(self.get_focus_targets()),
+                "fatigue_users_count": len(self.get_fatigue_data()),
+                "conversation_groups_count": len(self.get_conversation_counts()),
+                "last_activity_count": len(self._state_cache["last_activity"]),
+                "consecutive_responses_count": len(self.get_consecutive_responses()),
+                "state_file": str(self.state_dir),
+                "state_file_exists": bool(self._shard_sizes),
+                "state_file_size": sum(self._shard_sizes.values()),
+                "state_shard_count": len(self._shard_sizes)
+            }
+        return dict(self._statistics)
     
     def clear_all_state(self):
         """清空所有状态"""
         # 详细日志：开始清空所有状态
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 开始清空所有状态 - 当前状态键数量: {len(self._state_cache)}")
+        if self._detailed_logging and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[状态管理器] 开始清空所有状态 - 当前状态键数量: %s", len(self._state_cache))
         
         self._state_cache.clear()
-        self._save_state()
+        self._ensure_top_level_keys()
+        self._rewrite_all = True
+        self._mark_dirty()
+        # 立即交给后台线程写盘，不在此处等待；需要确认落盘时调用 flush()/aflush()
+        self._submit_pending()
         
         # 详细日志：所有状态已清空
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 所有状态已清空")
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 所有状态已清空")
         
         logger.info("所有状态已清空")
     
@@ -374,25 +986,28 @@ class StateManager:
         
         backup_file = self.plugin_data_dir / backup_name
         
+        # 先写入未保存的变更
+        self.flush()
+        
         # 详细日志：开始备份状态
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 开始备份状态 - 备份文件: {backup_file}, 状态键数量: {len(self._state_cache)}")
+        if self._detailed_logging and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[状态管理器] 开始备份状态 - 备份文件: %s, 状态键数量: %s", backup_file, len(self._state_cache))
         
         try:
-            with open(backup_file, 'w', encoding='utf-8') as f:
-                json.dump(self._state_cache, f, ensure_ascii=False, indent=2)
+            with open(backup_file, 'wb') as f:
+                f.write(_dumps(self._state_cache))
             
             # 详细日志：状态备份成功
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 状态备份成功 - 备份文件: {backup_file}")
+            if self._detailed_logging:
+                logger.debug("[状态管理器] 状态备份成功 - 备份文件: %s", backup_file)
             
             logger.info(f"状态已备份到 {backup_file}")
             return str(backup_file)
         except Exception as e:
             logger.error(f"备份状态失败: {e}")
             # 详细日志：状态备份失败
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 状态备份失败 - 错误: {e}")
+            if self._detailed_logging:
+                logger.debug("[状态管理器] 状态备份失败 - 错误: %s", e)
             raise
     
     def restore_state(self, backup_file_path: str):
@@ -400,19 +1015,18 @@ class StateManager:
         backup_file = Path(backup_file_path)
         
         # 详细日志：开始恢复状态
-        if self._is_detailed_logging():
-            logger.debug(f"[状态管理器] 开始恢复状态 - 备份文件: {backup_file}")
+        if self._detailed_logging:
+            logger.debug("[状态管理器] 开始恢复状态 - 备份文件: %s", backup_file)
         
         if not backup_file.exists():
             raise FileNotFoundError(f"备份文件不存在: {backup_file}")
         
         try:
-            with open(backup_file, 'r', encoding='utf-8') as f:
-                backup_state = json.load(f)
+            backup_state = _read_json_file(backup_file)
             
             # 详细日志：备份文件加载成功
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 备份文件加载成功 - 备份状态键数量: {len(backup_state)}")
+            if self._detailed_logging:
+                logger.debug("[状态管理器] 备份文件加载成功 - 备份状态键数量: %s", len(backup_state))
             
             # 验证备份文件格式
             if not isinstance(backup_state, dict):
@@ -420,16 +1034,19 @@ class StateManager:
             
             # 恢复状态
             self._state_cache = backup_state
-            self._save_state()
+            self._ensure_top_level_keys()
+            self._rewrite_all = True
+            self._mark_dirty()
+            self.flush()
             
             # 详细日志：状态恢复成功
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 状态恢复成功 - 恢复后状态键数量: {len(self._state_cache)}")
+            if self._detailed_logging and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[状态管理器] 状态恢复成功 - 恢复后状态键数量: %s", len(self._state_cache))
             
             logger.info(f"状态已从 {backup_file} 恢复")
         except Exception as e:
             logger.error(f"恢复状态失败: {e}")
             # 详细日志：状态恢复失败
-            if self._is_detailed_logging():
-                logger.debug(f"[状态管理器] 状态恢复失败 - 错误: {e}")
+            if self._detailed_logging:
+                logger.debug("[状态管理器] 状态恢复失败 - 错误: %s", e)
             raise
\ No newline at end of file
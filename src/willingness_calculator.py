@@ -11,10 +11,16 @@ __version__ = "V2.0.4"
 __author__ = "Him666233"
 __description__ = "意愿计算器模块：负责计算回复意愿"
 
+import array
+import bisect
+import functools
+import itertools
+import logging
 import time
 import math
+import operator
 import re
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Sequence, Tuple
 
 from astrbot.api import logger
 from astrbot.api.star import Context
@@ -28,6 +34,246 @@ except ImportError:
     HAS_JIEBA = False
     logger.info("jieba 未安装，使用内置分词")
 
+
+# 消息类型关键词（问题、情感、求助、分享、负面情绪）
+_QUESTION_INDICATORS = ("？", "?", "什么", "怎么", "为什么", "如何", "哪里", "什么时候", "谁")
+_EMOTION_INDICATORS = ("谢谢", "感谢", "哈哈", "😂", "😊", "👍", "❤️", "太棒了", "厉害")
+_HELP_INDICATORS = ("帮", "求助", "不会", "不懂", "请教", "指导", "建议")
+_SHARE_INDICATORS = ("分享", "推荐", "发现", "看到", "听说", "觉得")
+_NEGATIVE_INDICATORS = ("烦", "讨厌", "生气", "愤怒", "失望", "难过", "😠", "😢")
+
+# 所有类别合并为一个正则：每个类别一个命名分组，包在前瞻中使每个位置都被检查，
+# 一次扫描即可得到消息命中的全部类别（不同类别的关键词首字互不相同，同一位置最多命中一个类别）。
+# 阈值调整只使用情感关键词中较明确的前7个，因此情感关键词拆为两个分组。
+_MESSAGE_TYPE_GROUPS = (
+    ("question", _QUESTION_INDICATORS),
+    ("emotion", _EMOTION_INDICATORS[:7]),
+    ("emotion_extra", _EMOTION_INDICATORS[7:]),
+    ("help", _HELP_INDICATORS),
+    ("share", _SHARE_INDICATORS),
+    ("negative", _NEGATIVE_INDICATORS),
+)
+_MESSAGE_TYPE_RE = re.compile("(?=" + "|".join(
+    f"(?P<{name}>{'|'.join(map(re.escape, indicators))})"
+    for name, indicators in _MESSAGE_TYPE_GROUPS
+) + ")")
+
+
+def _message_types(message_content: str) -> set:
+    """返回消息命中的关键词类别名集合"""
+    return {match.lastgroup for match in _MESSAGE_TYPE_RE.finditer(message_content)}
+
+# 文本特征缓存容量：同一条历史消息会在之后的多次计算中反复出现
+TEXT_FEATURE_CACHE_SIZE = 2048
+
+# 消息质量评估中代表情感表达的符号
+_QUALITY_EMOTION_MARKS = ("！", "!", "😊", "😂", "👍", "❤️")
+
+
+@functools.lru_cache(maxsize=TEXT_FEATURE_CACHE_SIZE)
+def _message_quality(content: str) -> float:
+    """评估单条消息的质量（长度、互动性、情感表达），按文本缓存"""
+    score = 0.0
+
+    # 长度评估（太短或太长都降低质量）
+    content_length = len(content.strip())
+    if 5 <= content_length <= 200:
+        score += 0.3
+    elif content_length > 200:
+        score += 0.1  # 过长消息质量较低
+
+    # 互动性评估（包含@、问号等）
+    if "@" in content or "？" in content or "?" in content:
+        score += 0.4
+
+    # 情感表达评估（包含表情符号、感叹号等）
+    if any(mark in content for mark in _QUALITY_EMOTION_MARKS):
+        score += 0.3
+
+    return min(1.0, score)
+
+
+# 上下文相关性计算使用的词匹配
+_WORD_RE = re.compile(r'\w+')
+
+
+@functools.lru_cache(maxsize=TEXT_FEATURE_CACHE_SIZE)
+def _word_set(text: str) -> frozenset:
+    """提取文本（转小写后）的词集合，按文本缓存"""
+    return frozenset(_WORD_RE.findall(text.lower()))
+
+
+def _cosine_similarity(vec_a: Dict[str, int], norm_a: float, vec_b: Dict[str, int], norm_b: float) -> float:
+    """根据两个词频向量及其预先算好的范数计算余弦相似度
+    
+    点积只遍历较小的向量并在另一个向量中查找，无需先求交集。
+    """
+    if norm_a == 0 or norm_b == 0:
+        return 0.0
+    if len(vec_a) > len(vec_b):
+        vec_a, vec_b = vec_b, vec_a
+    numerator = 0
+    for word, count in vec_a.items():
+        other = vec_b.get(word)
+        if other:
+            numerator += count * other
+    return numerator / (norm_a * norm_b)
+
+
+# 无jieba时使用的简单分词正则
+_TOKEN_RE = re.compile(r'[\u4e00-\u9fa5]+|[a-zA-Z]+|\d+')
+# 分词函数在导入时选定一次：有jieba时使用jieba，否则使用简单正则分词
+_tokenize = jieba.cut if HAS_JIEBA else _TOKEN_RE.findall
+
+# 相似度缓存容量：重复检查与连续性检查会在相邻消息间反复比较同样的文本对
+SIMILARITY_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=TEXT_FEATURE_CACHE_SIZE)
+def _term_vector(text: str) -> Tuple[Dict[str, int], float, int]:
+    """计算文本的词频向量（已过滤停用词和单字）、范数及词指纹，按文本缓存
+    
+    词指纹是64位的小型Bloom过滤器，每个词按哈希值占一位。
+    返回的向量为缓存共享对象，调用方不得修改。
+    """
+    # 分词后过滤单字，同一遍循环内计算词频向量与词指纹
+    # （停用词"的、了、在、是、和、与、或、这、那、我、你、他、她、它"均为单字，过滤单字时已一并去除）
+    vec: Dict[str, int] = {}
+    fingerprint = 0
+    for w in _tokenize(text):
+        if len(w) > 1:
+            count = vec.get(w)
+            if count is None:
+                vec[w] = 1
+                fingerprint |= 1 << (hash(w) & 63)
+            else:
+                vec[w] = count + 1
+    return vec, math.hypot(*vec.values()), fingerprint
+
+
+_exp = math.exp
+
+
+def _similarity_sigmoid(cosine: float) -> float:
+    """使用sigmoid函数将余弦相似度映射到更合理的范围
+    
+    只在文本对未命中相似度缓存且存在共同词时调用，保留精确计算，避免查表带来的阈值边界误差。
+    """
+    return 1 / (1 + _exp(-8 * (cosine - 0.6)))
+
+
+# 两段文本没有共同词时的相似度
+_NO_OVERLAP_SIMILARITY = _similarity_sigmoid(0.0)
+# 两段文本完全相同（余弦为1）时的相似度
+_IDENTICAL_SIMILARITY = _similarity_sigmoid(1.0)
+
+
+@functools.lru_cache(maxsize=SIMILARITY_CACHE_SIZE)
+def _text_similarity(a: str, b: str) -> float:
+    """计算两段非空文本的相似度：求词频余弦，再经sigmoid映射"""
+    if a == b:
+        # 完全相同的文本（如重复发送）余弦必为1，只需确认过滤后仍有词
+        return _IDENTICAL_SIMILARITY if _term_vector(a)[0] else 0.0
+
+    vec_a, norm_a, fingerprint_a = _term_vector(a)
+    vec_b, norm_b, fingerprint_b = _term_vector(b)
+
+    if not vec_a or not vec_b:
+        return 0.0
+
+    # 共同词在两个指纹中占同一位，指纹不相交时余弦必为0，无需计算点积
+    if not fingerprint_a & fingerprint_b:
+        return _NO_OVERLAP_SIMILARITY
+
+    # 计算余弦相似度
+    cosine = _cosine_similarity(vec_a, norm_a, vec_b, norm_b)
+    return _similarity_sigmoid(cosine)
+
+
+class _HistorySweep:
+    """对话历史的一次性预处理结果
+    
+    在同一时间基准下预处理一次历史，按列记录每条消息的距今秒数，供各项因素计算共享，
+    避免重复遍历。用户等其他字段只在时间窗口内按需读取，开销与历史总长无关。
+    """
+
+    __slots__ = ("history", "now", "ages", "_in_order", "_ascending_ages")
+
+    def __init__(self, history: list, now: float):
+        self.history = history
+        self.now = now
+        # 距今秒数用推导式一次性构建并连续存储为double数组，窗口统计无需再访问消息字典
+        self.ages = array.array("d", [now - msg.get("timestamp", 0) for msg in history])
+        # 历史按时间追加时，距今秒数单调不增
+        ages = self.ages
+        self._in_order = all(map(operator.ge, ages, itertools.islice(ages, 1, None)))
+        self._ascending_ages: Optional[array.array] = None
+
+    @property
+    def in_order(self) -> bool:
+        """历史是否已按时间先后排列"""
+        return self._in_order
+
+    def count_within(self, seconds: float) -> int:
+        """统计最近N秒内的消息数量（在升序的距今秒数上二分查找）"""
+        if self._ascending_ages is None:
+            # 有序历史直接反转即为升序，只有乱序时才需要排序
+            self._ascending_ages = self.ages[::-1] if self._in_order else array.array("d", sorted(self.ages))
+        return bisect.bisect_left(self._ascending_ages, seconds)
+
+    def window(self, seconds: float) -> Sequence[int]:
+        """获取最近N秒内消息的下标（保持原有顺序），有序历史中即为末尾的一段"""
+        if self._in_order:
+            return range(len(self.ages) - self.count_within(seconds), len(self.ages))
+        return [index for index, age in enumerate(self.ages) if age < seconds]
+
+    def messages_within(self, seconds: float) -> list:
+        """获取最近N秒内的消息（保持原有顺序）"""
+        history = self.history
+        return [history[index] for index in self.window(seconds)]
+
+    def recent_contents(self, limit: int, seconds: float) -> list:
+        """获取最近limit条消息中N秒内的非空内容（保持原有顺序）"""
+        history = self.history
+        ages = self.ages
+        contents = []
+        for index in range(max(0, len(history) - limit), len(history)):
+            if ages[index] < seconds:
+                content = history[index].get("content", "")
+                if content:
+                    contents.append(content)
+        return contents
+
+    def last_assistant_content(self) -> Optional[str]:
+        """获取最近一条机器人回复的内容，没有时返回None"""
+        # 只在未记录最近回复时才需要，从末尾反向查找，找到即停止
+        history = self.history
+        for index in range(len(history) - 1, -1, -1):
+            if history[index].get("role") == "assistant":
+                return history[index].get("content", "")
+        return None
+
+
+class _HeartflowState:
+    """群组心流状态：能量、上次回复时间与连续回复数"""
+
+    __slots__ = ("energy", "last_reply_ts", "streak")
+
+    def __init__(self, energy: float = 0.8, last_reply_ts: float = 0.0, streak: int = 0):
+        self.energy = energy  # 初始能量
+        self.last_reply_ts = last_reply_ts
+        self.streak = streak
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "_HeartflowState":
+        """从持久化的字典恢复状态"""
+        return cls(data.get("energy", 0.8), data.get("last_reply_ts", 0), data.get("streak", 0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可持久化的字典"""
+        return {"energy": self.energy, "last_reply_ts": self.last_reply_ts, "streak": self.streak}
+
+
 class WillingnessCalculator:
     """意愿计算器"""
 
@@ -36,8 +282,36 @@ class WillingnessCalculator:
         self.config = config
         self.impression_manager = impression_manager
         self.state_manager = state_manager
+        # 群组ID -> (持久化的状态字典, 心流状态对象)
+        self._hf_states: Dict[str, Tuple[Any, _HeartflowState]] = {}
+        # 热路径上用到的配置项在初始化时读取一次，配置变更后通过 reload_config() 刷新
+        self._load_config_values()
+        # jieba 在首次分词时才加载词典，提前在初始化时完成，避免拖慢第一条消息的相似度计算
+        if HAS_JIEBA:
+            jieba.initialize()
+    
+    def _load_config_values(self):
+        """读取并缓存热路径上用到的配置项与详细日志开关"""
+        self._base_probability = getattr(self.config, 'base_probability', 0.3)
+        self._willingness_threshold = getattr(self.config, 'willingness_threshold', 0.5)
+        self._fatigue_threshold = getattr(self.config, 'fatigue_threshold', 5)
+        self._air_reading_enabled = getattr(self.config, 'air_reading_enabled', True)
+        self._detailed_logging = self._compute_detailed_logging()
+    
+    def reload_config(self, config: Any = None):
+        """重新读取配置（可传入新配置），刷新缓存的配置项"""
+        if config is not None:
+            self.config = config
+        self._load_config_values()
     
-    def _is_detailed_logging(self) -> bool:
+    def clear_caches(self):
+        """清空按文本缓存的相似度与文本特征（插件终止或重载时调用）"""
+        _text_similarity.cache_clear()
+        _term_vector.cache_clear()
+        _word_set.cache_clear()
+        _message_quality.cache_clear()
+
+    def _compute_detailed_logging(self) -> bool:
         """检查是否启用详细日志"""
         # 先检查顶层配置
         if hasattr(self.config, 'enable_detailed_logging') and self.config.enable_detailed_logging:
@@ -53,34 +327,45 @@ class WillingnessCalculator:
         group_id = event.get_group_id()
 
         # 详细日志：开始计算意愿
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 开始计算回复意愿 - 用户: {user_id}, 群组: {group_id}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 开始计算回复意愿 - 用户: %s, 群组: %s", user_id, group_id)
 
         # 获取配置
-        base_probability = getattr(self.config, 'base_probability', 0.3)
-        willingness_threshold = getattr(self.config, 'willingness_threshold', 0.5)
+        base_probability = self._base_probability
+        willingness_threshold = self._willingness_threshold
 
         # 获取用户印象
         user_impression = await self.impression_manager.get_user_impression(user_id, group_id)
         impression_score = user_impression.get("score", 0.5)
 
-        # 检查重复消息（防止重复回复同一问题）
-        duplicate_penalty = self._check_duplicate_message(event, chat_context)
+        # 统一时间基准，对话历史只预处理一次，供各因素计算共享
+        sweep = _HistorySweep(chat_context.get("conversation_history", []), time.time())
+        # 当前消息的小写形式只计算一次，供消息类型与上下文相关性计算共享
+        msg_lower = event.message_str.lower()
 
-        # 计算各种因素
-        group_activity = self._calculate_group_activity(chat_context)
-        continuity_bonus = self._calculate_continuity_bonus(user_id, chat_context)
+        if sweep.history:
+            # 检查重复消息（防止重复回复同一问题）
+            duplicate_penalty = self._check_duplicate_message(event, chat_context, sweep)
+
+            # 计算各种因素
+            group_activity = self._calculate_group_activity(sweep)
+            continuity_bonus = self._calculate_continuity_bonus(user_id, chat_context, sweep)
+        else:
+            # 没有对话历史时，重复惩罚、群活跃度与连续奖励均为0，无需逐项计算
+            duplicate_penalty = group_activity = continuity_bonus = 0.0
         fatigue_penalty = self._calculate_fatigue_penalty(user_id, chat_context)
 
         # 心流节奏融入：基于时间间隔动态调整阈值
-        dynamic_threshold = self._calculate_dynamic_threshold(event, chat_context, willingness_threshold)
+        dynamic_threshold = self._calculate_dynamic_threshold(event, chat_context, willingness_threshold, sweep, msg_lower)
 
         # 详细日志：各因素计算结果
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 各因素计算结果 - 基础概率: {base_probability:.3f}, 印象分: {impression_score:.3f}, "
-                       f"群活跃度: {group_activity:.3f}, 连续奖励: {continuity_bonus:.3f}, "
-                       f"疲劳惩罚: {fatigue_penalty:.3f}, 重复惩罚: {duplicate_penalty:.3f}, "
-                       f"动态阈值: {dynamic_threshold:.3f}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 各因素计算结果 - 基础概率: %.3f, 印象分: %.3f, "
+                         "群活跃度: %.3f, 连续奖励: %.3f, "
+                         "疲劳惩罚: %.3f, 重复惩罚: %.3f, "
+                         "动态阈值: %.3f",
+                         base_probability, impression_score, group_activity, continuity_bonus,
+                         fatigue_penalty, duplicate_penalty, dynamic_threshold)
 
         # 优化版本：更智能的意愿计算算法
         # 1. 基础意愿计算（更平衡的权重分配）
@@ -96,8 +381,8 @@ class WillingnessCalculator:
         calculated_willingness = base_willingness * penalty_factor
         
         # 3. 智能调整：根据消息类型和上下文动态调整
-        message_type_bonus = self._calculate_message_type_bonus(event, chat_context)
-        context_relevance_bonus = self._calculate_context_relevance_bonus(event, chat_context)
+        message_type_bonus = self._calculate_message_type_bonus(event, chat_context, msg_lower)
+        context_relevance_bonus = self._calculate_context_relevance_bonus(sweep, msg_lower) if sweep.history else 0.0
         
         # 4. 最终意愿值计算
         calculated_willingness = (
@@ -109,15 +394,15 @@ class WillingnessCalculator:
         final_willingness = max(0.0, min(1.0, calculated_willingness))
 
         # 详细日志：最终意愿值
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 意愿计算结果 - 计算值: {calculated_willingness:.3f}, 最终值: {final_willingness:.3f}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 意愿计算结果 - 计算值: %.3f, 最终值: %.3f", calculated_willingness, final_willingness)
 
         # 如果启用读空气功能，让 LLM 做最终决策
-        if getattr(self.config, 'air_reading_enabled', True):
+        if self._air_reading_enabled:
             # 详细日志：读空气模式决策
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 读空气模式 - 意愿值: {final_willingness:.3f}, 动态阈值: {dynamic_threshold:.3f}, "
-                           f"由LLM决定是否回复")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 读空气模式 - 意愿值: %.3f, 动态阈值: %.3f, "
+                             "由LLM决定是否回复", final_willingness, dynamic_threshold)
             
             result = {
                 "should_respond": None,  # 由 LLM 决定
@@ -137,35 +422,34 @@ class WillingnessCalculator:
             should_respond = final_willingness >= dynamic_threshold
             
             # 详细日志：直接阈值决策
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 直接阈值决策 - 意愿值: {final_willingness:.3f}, 动态阈值: {dynamic_threshold:.3f}, "
-                           f"是否回复: {should_respond}")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 直接阈值决策 - 意愿值: %.3f, 动态阈值: %.3f, "
+                             "是否回复: %s", final_willingness, dynamic_threshold, should_respond)
             
             result = {
                 "should_respond": should_respond,
                 "willingness_score": final_willingness,
-                "requires_llm_decision": False,
-                "decision_context": {
+                "requires_llm_decision": False
+            }
+            # 阈值决策流程不读取决策上下文，只在详细日志输出结果时附带
+            if self._detailed_logging:
+                result["decision_context"] = {
                     "base_willingness": final_willingness,
                     "original_threshold": willingness_threshold,
                     "dynamic_threshold": dynamic_threshold
                 }
-            }
         
         # 详细日志：最终决策结果
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 决策完成 - 结果: {result}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 决策完成 - 结果: %s", result)
         
         return result
     
-    def _calculate_group_activity(self, chat_context: Dict) -> float:
+    def _calculate_group_activity(self, sweep: _HistorySweep) -> float:
         """计算多维度群活跃度"""
-        conversation_history = chat_context.get("conversation_history", [])
-        if not conversation_history:
+        if not sweep.history:
             return 0.0
 
-        current_time = time.time()
-
         # 1. 时间窗口分析（多时间段）
         time_windows = [
             (60, 0.4),   # 最近1分钟，权重40%
@@ -176,25 +460,30 @@ class WillingnessCalculator:
 
         activity_score = 0.0
         for window_seconds, weight in time_windows:
-            recent_count = sum(1 for msg in conversation_history
-                             if current_time - msg.get("timestamp", 0) < window_seconds)
+            recent_count = sweep.count_within(window_seconds)
             # 标准化到0-1范围（假设每分钟最大5条消息为活跃）
             normalized_count = min(1.0, recent_count / (window_seconds / 60 * 5))
             activity_score += normalized_count * weight
 
-        # 2. 用户参与度分析
+        # 2. 用户参与度分析与 3. 消息质量评估：同为最近5分钟，一次遍历完成
+        # （有序历史中窗口为末尾一段，开销只与窗口内消息数有关，与历史总长无关）
+        history = sweep.history
         recent_users = set()
-        for msg in conversation_history:
-            if current_time - msg.get("timestamp", 0) < 300:  # 最近5分钟
-                recent_users.add(msg.get("user_id", ""))
+        quality_total = 0.0
+        window = sweep.window(300)
+        # 循环内反复使用的函数先绑定为局部名，避免每次迭代查找全局与属性
+        add_user = recent_users.add
+        message_quality = _message_quality
+        for index in window:
+            msg = history[index]
+            add_user(msg.get("user_id", ""))
+            quality_total += message_quality(msg.get("content", ""))
 
         user_participation = min(1.0, len(recent_users) / 10.0)  # 假设10个活跃用户为满分
-
-        # 3. 消息质量评估
-        quality_score = self._assess_message_quality(conversation_history, current_time)
+        quality_score = quality_total / len(window) if window else 0.0
 
         # 4. 话题持续性分析
-        topic_continuity = self._assess_topic_continuity(conversation_history, current_time)
+        topic_continuity = self._assess_topic_continuity(sweep)
 
         # 综合评分（活跃度40% + 用户参与30% + 质量20% + 持续性10%）
         final_activity = (
@@ -206,72 +495,61 @@ class WillingnessCalculator:
 
         return min(1.0, max(0.0, final_activity))
     
-    def _calculate_message_type_bonus(self, event: Any, chat_context: Dict) -> float:
-        """计算消息类型奖励，提升对特定类型消息的回复意愿"""
-        message_content = event.message_str.lower()
+    def _calculate_message_type_bonus(self, event: Any, chat_context: Dict, message_content: str) -> float:
+        """计算消息类型奖励，提升对特定类型消息的回复意愿（message_content 为小写的当前消息）"""
         bonus = 0.0
         
         # 1. 直接@消息（最高优先级）
         if "@" in message_content:
             bonus += 0.4
         
+        message_types = _message_types(message_content)
+        
         # 2. 问题类消息
-        question_indicators = ["？", "?", "什么", "怎么", "为什么", "如何", "哪里", "什么时候", "谁"]
-        if any(indicator in message_content for indicator in question_indicators):
+        if "question" in message_types:
             bonus += 0.3
         
         # 3. 情感表达类消息
-        emotion_indicators = ["谢谢", "感谢", "哈哈", "😂", "😊", "👍", "❤️", "太棒了", "厉害"]
-        if any(indicator in message_content for indicator in emotion_indicators):
+        if "emotion" in message_types or "emotion_extra" in message_types:
             bonus += 0.2
         
         # 4. 求助类消息
-        help_indicators = ["帮", "求助", "不会", "不懂", "请教", "指导", "建议"]
-        if any(indicator in message_content for indicator in help_indicators):
+        if "help" in message_types:
             bonus += 0.25
         
         # 5. 分享类消息
-        share_indicators = ["分享", "推荐", "发现", "看到", "听说", "觉得"]
-        if any(indicator in message_content for indicator in share_indicators):
+        if "share" in message_types:
             bonus += 0.15
         
         # 6. 负面情绪检测（降低回复意愿）
-        negative_indicators = ["烦", "讨厌", "生气", "愤怒", "失望", "难过", "😠", "😢"]
-        if any(indicator in message_content for indicator in negative_indicators):
+        if "negative" in message_types:
             bonus -= 0.2
         
         return max(-0.3, min(0.5, bonus))  # 限制在-0.3到0.5之间
     
-    def _calculate_context_relevance_bonus(self, event: Any, chat_context: Dict) -> float:
-        """计算上下文相关性奖励，提升对相关话题的回复意愿"""
-        current_message = event.message_str.lower()
-        conversation_history = chat_context.get("conversation_history", [])
-        
-        if not conversation_history:
+    def _calculate_context_relevance_bonus(self, sweep: _HistorySweep, current_message: str) -> float:
+        """计算上下文相关性奖励，提升对相关话题的回复意愿（current_message 为小写的当前消息）"""
+        if not sweep.history:
             return 0.0
         
-        # 获取最近的消息内容
-        recent_messages = []
-        current_time = time.time()
-        for msg in conversation_history[-10:]:  # 最近10条消息
-            if current_time - msg.get("timestamp", 0) < 1800:  # 30分钟内
-                content = msg.get("content", "").lower()
-                if content:
-                    recent_messages.append(content)
+        # 获取最近的消息内容：最近10条消息中30分钟内的
+        recent_messages = sweep.recent_contents(10, 1800)
         
         if not recent_messages:
             return 0.0
         
         # 计算关键词重叠度
-        current_words = set(re.findall(r'\w+', current_message))
+        current_words = _word_set(current_message)
+        current_count = len(current_words)
         relevance_score = 0.0
         
-        for msg_content in recent_messages:
-            msg_words = set(re.findall(r'\w+', msg_content))
-            if current_words and msg_words:
-                # 计算词汇重叠度
-                overlap = len(current_words & msg_words) / len(current_words | msg_words)
-                relevance_score += overlap
+        if current_words:
+            for msg_content in recent_messages:
+                msg_words = _word_set(msg_content)
+                if msg_words:
+                    # 计算词汇重叠度（并集大小由交集推出，无需构造并集）
+                    common = len(current_words & msg_words)
+                    relevance_score += common / (current_count + len(msg_words) - common)
         
         # 平均相关性分数
         avg_relevance = relevance_score / len(recent_messages) if recent_messages else 0.0
@@ -279,48 +557,16 @@ class WillingnessCalculator:
         # 转换为奖励值（0-0.3之间）
         return min(0.3, avg_relevance * 0.5)
 
-    def _assess_message_quality(self, conversation_history: list, current_time: float) -> float:
-        """评估消息质量"""
-        recent_messages = [msg for msg in conversation_history
-                          if current_time - msg.get("timestamp", 0) < 300]
-
-        if not recent_messages:
-            return 0.0
-
-        quality_scores = []
-        for msg in recent_messages:
-            content = msg.get("content", "")
-            score = 0.0
-
-            # 长度评估（太短或太长都降低质量）
-            content_length = len(content.strip())
-            if 5 <= content_length <= 200:
-                score += 0.3
-            elif content_length > 200:
-                score += 0.1  # 过长消息质量较低
-
-            # 互动性评估（包含@、问号等）
-            if "@" in content or "？" in content or "?" in content:
-                score += 0.4
-
-            # 情感表达评估（包含表情符号、感叹号等）
-            if any(char in content for char in ["！", "!", "😊", "😂", "👍", "❤️"]):
-                score += 0.3
-
-            quality_scores.append(min(1.0, score))
-
-        return sum(quality_scores) / len(quality_scores) if quality_scores else 0.0
-
-    def _assess_topic_continuity(self, conversation_history: list, current_time: float) -> float:
+    def _assess_topic_continuity(self, sweep: _HistorySweep) -> float:
         """评估话题持续性"""
-        recent_messages = [msg for msg in conversation_history
-                          if current_time - msg.get("timestamp", 0) < 600]  # 最近10分钟
+        window = sweep.window(600)  # 最近10分钟
 
-        if len(recent_messages) < 3:
+        if len(window) < 3:
             return 0.0
 
-        # 简单的话题持续性：检查是否有重复的用户交互
-        user_sequence = [msg.get("user_id", "") for msg in recent_messages[-10:]]
+        # 简单的话题持续性：检查是否有重复的用户交互（只取窗口内最后10条的用户）
+        history = sweep.history
+        user_sequence = [history[index].get("user_id", "") for index in window[-10:]]
         continuity_score = 0.0
 
         # 检查连续对话模式
@@ -337,9 +583,9 @@ class WillingnessCalculator:
 
         return min(1.0, continuity_score)
     
-    def _calculate_continuity_bonus(self, user_id: str, chat_context: Dict) -> float:
+    def _calculate_continuity_bonus(self, user_id: str, chat_context: Dict, sweep: _HistorySweep) -> float:
         """计算连续对话奖励"""
-        conversation_history = chat_context.get("conversation_history", [])
+        conversation_history = sweep.history
         group_id = chat_context.get("group_id", "default")
 
         bonus = 0.0
@@ -353,11 +599,7 @@ class WillingnessCalculator:
         # 2. 融入相似度计算：检查与最近机器人回复的相似度
         if len(conversation_history) >= 1:
             # 找到最近的机器人回复
-            last_bot_reply = None
-            for msg in reversed(conversation_history):
-                if msg.get("role") == "assistant":
-                    last_bot_reply = msg.get("content", "")
-                    break
+            last_bot_reply = self._hf_last_bot_reply(group_id, sweep)
 
             if last_bot_reply:
                 # 获取当前消息（假设是conversation_history的最后一个）
@@ -374,99 +616,96 @@ class WillingnessCalculator:
 
         return min(0.5, bonus)  # 最高奖励0.5
     
-    def _check_duplicate_message(self, event: Any, chat_context: Dict) -> float:
+    def _check_duplicate_message(self, event: Any, chat_context: Dict, sweep: _HistorySweep) -> float:
         """检查重复消息，返回惩罚值（0-1之间）"""
-        conversation_history = chat_context.get("conversation_history", [])
-        if not conversation_history:
+        if not sweep.history:
             return 0.0
         
         current_message = event.message_str.strip()
-        current_time = time.time()
         
         # 详细日志：开始检查重复消息
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 开始检查重复消息 - 当前消息: {current_message[:50]}...")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 开始检查重复消息 - 当前消息: %s...", current_message[:50])
         
         # 检查最近3分钟内的消息（更短的时间窗口）
-        recent_messages = [
-            msg for msg in conversation_history 
-            if current_time - msg.get("timestamp", 0) < 180  # 3分钟内
-        ]
+        recent_messages = sweep.messages_within(180)  # 3分钟内
         
         if not recent_messages:
             # 详细日志：无最近消息
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 重复检查 - 无最近3分钟内的消息")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 重复检查 - 无最近3分钟内的消息")
             return 0.0
         
-        # 查找所有机器人回复
+        # 查找所有机器人回复与用户消息（只需内容，分词特征按文本缓存）
         bot_replies = []
         user_messages = []
         
         for msg in recent_messages:
-            if msg.get("role") == "assistant":
+            role = msg.get("role")
+            if role == "assistant":
                 bot_replies.append(msg.get("content", "").strip())
-            elif msg.get("role") == "user":
-                user_messages.append({
-                    "content": msg.get("content", "").strip(),
-                    "timestamp": msg.get("timestamp", 0)
-                })
+            elif role == "user":
+                user_messages.append(msg.get("content", "").strip())
         
         # 如果没有机器人回复，不需要检查重复
         if not bot_replies:
             # 详细日志：无机器人回复
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 重复检查 - 无机器人回复，无需检查")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 重复检查 - 无机器人回复，无需检查")
             return 0.0
         
         # 检查当前消息是否与最近的用户消息相似（可能是用户重复发送）
         if user_messages:
             # 获取最近的非当前用户消息
-            recent_user_messages = [msg for msg in user_messages if msg["content"] != current_message]
+            recent_user_messages = [content for content in user_messages if content != current_message]
             if recent_user_messages:
-                latest_user_msg = recent_user_messages[-1]["content"]
+                latest_user_msg = recent_user_messages[-1]
                 similarity = self._hf_similarity(current_message, latest_user_msg, chat_context.get("group_id", "default"))
                 
                 # 详细日志：用户消息相似度检查
-                if self._is_detailed_logging():
-                    logger.debug(f"[意愿计算器] 重复检查 - 用户消息相似度: {similarity:.3f}")
+                if self._detailed_logging:
+                    logger.debug("[意愿计算器] 重复检查 - 用户消息相似度: %.3f", similarity)
                 
                 # 如果与最近用户消息高度相似，可能是重复问题
                 if similarity > 0.8:
                     logger.info(f"检测到与最近用户消息重复，相似度: {similarity:.2f}，给予惩罚")
                     # 详细日志：高相似度惩罚
-                    if self._is_detailed_logging():
-                        logger.debug(f"[意愿计算器] 重复检查 - 高相似度惩罚: 0.6")
+                    if self._detailed_logging:
+                        logger.debug("[意愿计算器] 重复检查 - 高相似度惩罚: 0.6")
                     return 0.6  # 较高惩罚
         
         # 检查当前消息是否与机器人回复前的用户消息相似
-        # 按时间顺序处理消息
-        sorted_messages = sorted(recent_messages, key=lambda x: x.get("timestamp", 0))
+        # 按时间顺序处理消息（历史按时间追加时窗口内已有序，仅乱序时才排序）
+        if sweep.in_order:
+            sorted_messages = recent_messages
+        else:
+            sorted_messages = sorted(recent_messages, key=lambda x: x.get("timestamp", 0))
         
-        for i, msg in enumerate(sorted_messages):
-            if msg.get("role") == "assistant":
+        # 从最近的机器人回复开始反向查找（刚回答过的问题最可能被重复提出），命中即返回
+        group_id = chat_context.get("group_id", "default")
+        for i in range(len(sorted_messages) - 1, 0, -1):
+            if sorted_messages[i].get("role") == "assistant":
                 # 找到机器人回复，检查前面的用户消息
-                if i > 0:
-                    prev_msg = sorted_messages[i-1]
-                    if prev_msg.get("role") == "user":
-                        user_msg_content = prev_msg.get("content", "").strip()
-                        similarity = self._hf_similarity(current_message, user_msg_content, chat_context.get("group_id", "default"))
-                        
-                        # 详细日志：机器人回复前消息相似度检查
-                        if self._is_detailed_logging():
-                            logger.debug(f"[意愿计算器] 重复检查 - 机器人回复前消息相似度: {similarity:.3f}")
-                        
-                        # 如果高度相似，认为是重复问题
-                        if similarity > 0.7:
-                            logger.info(f"检测到重复问题消息，相似度: {similarity:.2f}，给予惩罚")
-                            # 详细日志：中等相似度惩罚
-                            if self._is_detailed_logging():
-                                logger.debug(f"[意愿计算器] 重复检查 - 中等相似度惩罚: 0.4")
-                            return 0.4  # 中等惩罚
+                prev_msg = sorted_messages[i-1]
+                if prev_msg.get("role") == "user":
+                    user_msg_content = prev_msg.get("content", "").strip()
+                    similarity = self._hf_similarity(current_message, user_msg_content, group_id)
+                    
+                    # 详细日志：机器人回复前消息相似度检查
+                    if self._detailed_logging:
+                        logger.debug("[意愿计算器] 重复检查 - 机器人回复前消息相似度: %.3f", similarity)
+                    
+                    # 如果高度相似，认为是重复问题
+                    if similarity > 0.7:
+                        logger.info(f"检测到重复问题消息，相似度: {similarity:.2f}，给予惩罚")
+                        # 详细日志：中等相似度惩罚
+                        if self._detailed_logging:
+                            logger.debug("[意愿计算器] 重复检查 - 中等相似度惩罚: 0.4")
+                        return 0.4  # 中等惩罚
         
         # 详细日志：无重复消息
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 重复检查 - 无重复消息，惩罚: 0.0")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 重复检查 - 无重复消息，惩罚: 0.0")
         
         return 0.0
     
@@ -476,141 +715,152 @@ class WillingnessCalculator:
         user_fatigue = fatigue_data.get(user_id, 0)
 
         # 详细日志：疲劳度检查
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 疲劳度检查 - 用户: {user_id}, 疲劳值: {user_fatigue}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 疲劳度检查 - 用户: %s, 疲劳值: %s", user_id, user_fatigue)
 
         # 根据疲劳度计算惩罚
-        fatigue_threshold = getattr(self.config, 'fatigue_threshold', 5)
+        fatigue_threshold = self._fatigue_threshold
         if user_fatigue >= fatigue_threshold:
             # 详细日志：高疲劳度惩罚
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 疲劳度检查 - 高疲劳度惩罚: 0.5")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 疲劳度检查 - 高疲劳度惩罚: 0.5")
             return 0.5  # 高疲劳度惩罚
 
         penalty = user_fatigue * 0.05  # 线性疲劳惩罚
         
         # 详细日志：线性疲劳惩罚
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 疲劳度检查 - 线性疲劳惩罚: {penalty:.3f}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 疲劳度检查 - 线性疲劳惩罚: %.3f", penalty)
         
         return penalty
 
-    def _calculate_dynamic_threshold(self, event: Any, chat_context: Dict, base_threshold: float) -> float:
+    def _calculate_dynamic_threshold(self, event: Any, chat_context: Dict, base_threshold: float, sweep: _HistorySweep, msg_lower: str) -> float:
         """计算动态阈值（优化版本：更智能的心流节奏）"""
         group_id = event.get_group_id()
         if not group_id:
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 动态阈值计算 - 无群组ID，返回基础阈值: {base_threshold:.3f}")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 动态阈值计算 - 无群组ID，返回基础阈值: %.3f", base_threshold)
             return base_threshold
 
         # 获取心流状态
         state = self._hf_get_state(group_id)
-        current_time = time.time()
-        conversation_history = chat_context.get("conversation_history", [])
+        current_time = sweep.now
 
         # 智能冷却时间计算
         base_cooldown = 30.0  # 基础冷却时间缩短到30秒
         
         # 根据群活跃度动态调整冷却时间
-        recent_count = sum(1 for msg in conversation_history
-                          if current_time - msg.get("timestamp", 0) < 60)
+        recent_count = sweep.count_within(60)
         activity_factor = min(1.0, recent_count / 3.0)  # 每分钟最多3条消息为基准
         cooldown = base_cooldown * (1.0 - 0.4 * activity_factor)  # 活跃时冷却时间减少40%
 
-        # 详细日志：动态阈值计算参数
-        if self._is_detailed_logging():
-            dt = current_time - state.get("last_reply_ts", 0)
-            streak = state.get("streak", 0)
+        # 详细日志：动态阈值计算参数（需额外检查@提及，仅在确实输出DEBUG日志时计算）
+        if self._detailed_logging and logger.isEnabledFor(logging.DEBUG):
+            dt = current_time - state.last_reply_ts
+            streak = state.streak
             is_at_me = self._hf_is_at_me(event)
-            logger.debug(f"[意愿计算器] 动态阈值计算 - 基础阈值: {base_threshold:.3f}, 冷却时间: {cooldown:.1f}s, "
-                       f"时间间隔: {dt:.1f}s, 连续回复: {streak}, @提及: {is_at_me}")
+            logger.debug("[意愿计算器] 动态阈值计算 - 基础阈值: %.3f, 冷却时间: %.1fs, "
+                         "时间间隔: %.1fs, 连续回复: %s, @提及: %s", base_threshold, cooldown, dt, streak, is_at_me)
 
         # 检查时间间隔
-        dt = current_time - state.get("last_reply_ts", 0)
+        dt = current_time - state.last_reply_ts
         if dt < cooldown:
             # 距离上次回复太近，提高阈值（减少回复概率）
             time_penalty = (cooldown - dt) / cooldown * 0.15  # 减少惩罚强度
             result = min(0.85, base_threshold + time_penalty)
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 动态阈值计算 - 时间间隔惩罚: {result:.3f}")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 动态阈值计算 - 时间间隔惩罚: %.3f", result)
             return result
 
         # @提及大幅降低阈值（提高回复概率）
         if self._hf_is_at_me(event):
             result = max(0.05, base_threshold - 0.15)  # 更大幅度的降低
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 动态阈值计算 - @提及降低阈值: {result:.3f}")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 动态阈值计算 - @提及降低阈值: %.3f", result)
             return result
 
         # 连续回复数适度提高阈值
-        streak = state.get("streak", 0)
+        streak = state.streak
         if streak > 0:
             streak_penalty = min(0.15, streak * 0.03)  # 减少连续回复惩罚
             result = min(0.85, base_threshold + streak_penalty)
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 动态阈值计算 - 连续回复惩罚: {result:.3f}")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 动态阈值计算 - 连续回复惩罚: %.3f", result)
             return result
 
         # 智能调整：根据消息类型微调阈值
-        message_type_adjustment = self._calculate_message_type_threshold_adjustment(event)
+        message_type_adjustment = self._calculate_message_type_threshold_adjustment(msg_lower)
         result = max(0.1, min(0.9, base_threshold + message_type_adjustment))
         
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 动态阈值计算 - 消息类型调整: {message_type_adjustment:.3f}, 最终阈值: {result:.3f}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 动态阈值计算 - 消息类型调整: %.3f, 最终阈值: %.3f", message_type_adjustment, result)
         
         return result
     
-    def _calculate_message_type_threshold_adjustment(self, event: Any) -> float:
-        """根据消息类型调整阈值"""
-        message_content = event.message_str.lower()
+    def _calculate_message_type_threshold_adjustment(self, message_content: str) -> float:
+        """根据消息类型调整阈值（message_content 为小写的当前消息）"""
         adjustment = 0.0
         
+        message_types = _message_types(message_content)
+        
         # 问题类消息降低阈值（更容易回复）
-        question_indicators = ["？", "?", "什么", "怎么", "为什么", "如何", "哪里", "什么时候", "谁"]
-        if any(indicator in message_content for indicator in question_indicators):
+        if "question" in message_types:
             adjustment -= 0.1
         
         # 求助类消息降低阈值
-        help_indicators = ["帮", "求助", "不会", "不懂", "请教", "指导", "建议"]
-        if any(indicator in message_content for indicator in help_indicators):
+        if "help" in message_types:
             adjustment -= 0.08
         
         # 情感表达类消息适度降低阈值
-        emotion_indicators = ["谢谢", "感谢", "哈哈", "😂", "😊", "👍", "❤️"]
-        if any(indicator in message_content for indicator in emotion_indicators):
+        if "emotion" in message_types:
             adjustment -= 0.05
         
         # 负面情绪消息提高阈值（减少回复）
-        negative_indicators = ["烦", "讨厌", "生气", "愤怒", "失望", "难过", "😠", "😢"]
-        if any(indicator in message_content for indicator in negative_indicators):
+        if "negative" in message_types:
             adjustment += 0.1
         
         return max(-0.15, min(0.15, adjustment))  # 限制调整范围
 
     # 心流算法相关方法
-    def _hf_get_state(self, group_id: str) -> Dict:
-        """获取心流状态"""
+    def _hf_get_state(self, group_id: str) -> _HeartflowState:
+        """获取心流状态
+        
+        每个群组的状态对象缓存在内存中，只有持久化的状态被替换（如清空或恢复）后才重新读取。
+        """
         key = f"heartflow:{group_id}"
-        state = self.state_manager.get(key, {})
-        if not state:
-            state = {
-                "energy": 0.8,  # 初始能量
-                "last_reply_ts": 0.0,
-                "streak": 0
-            }
-            self.state_manager.set(key, state)
+        stored = self.state_manager.get(key)
+        cached = self._hf_states.get(group_id)
+        if cached is not None and cached[0] is stored:
+            return cached[1]
+        if stored:
+            state = _HeartflowState.from_dict(stored)
+        else:
+            state = _HeartflowState()
+            stored = state.to_dict()
+            self.state_manager.set(key, stored)
+        self._hf_states[group_id] = (stored, state)
         return state
 
-    def _hf_save_state(self, group_id: str, state: Dict):
-        """保存心流状态"""
+    def _hf_save_state(self, group_id: str, state: _HeartflowState):
+        """保存心流状态（转换为字典）
+        
+        心流状态每条消息都会变化，不逐条写增量日志，由延迟保存统一写入分片。
+        """
         key = f"heartflow:{group_id}"
-        self.state_manager.set(key, state)
-
-    def _hf_norm_count_last_seconds(self, conversation_history: list, seconds: int) -> float:
+        stored = state.to_dict()
+        self.state_manager.update(key, stored, save=False)
+        self._hf_states[group_id] = (stored, state)
+
+    def _hf_last_bot_reply(self, group_id: str, sweep: _HistorySweep) -> Optional[str]:
+        """获取最近一条机器人回复：优先使用回复时记录的内容，没有记录时回退到历史中查找"""
+        last_bot_reply = self.state_manager.get(f"last_bot:{group_id}")
+        if last_bot_reply is None:
+            last_bot_reply = sweep.last_assistant_content()
+        return last_bot_reply
+
+    def _hf_norm_count_last_seconds(self, sweep: _HistorySweep, seconds: int) -> float:
         """计算最近N秒内的消息数量并归一化"""
-        current_time = time.time()
-        recent_count = sum(1 for msg in conversation_history
-                          if current_time - msg.get("timestamp", 0) < seconds)
+        recent_count = sweep.count_within(seconds)
         # 归一化：假设每分钟最多5条消息为活跃
         return min(1.0, recent_count / (seconds / 60 * 5))
 
@@ -633,109 +883,73 @@ class WillingnessCalculator:
         return False
 
     def _hf_similarity(self, a: str, b: str, group_id: str) -> float:
-        """计算两段文本的相似度（学习Wakepro）"""
+        """计算两段文本的相似度（学习Wakepro），结果与群组无关，按文本对缓存"""
         if not a or not b:
             return 0.0
-
-        # 分词处理
-        if HAS_JIEBA:
-            words_a = list(jieba.cut(a))
-            words_b = list(jieba.cut(b))
-        else:
-            # 无jieba时使用简单正则分词
-            words_a = re.findall(r'[\u4e00-\u9fa5]+|[a-zA-Z]+|\d+', a)
-            words_b = re.findall(r'[\u4e00-\u9fa5]+|[a-zA-Z]+|\d+', b)
-
-        # 过滤停用词和单字
-        stop_words = {"的", "了", "在", "是", "和", "与", "或", "这", "那", "我", "你", "他", "她", "它"}
-        words_a = [w for w in words_a if len(w) > 1 and w not in stop_words]
-        words_b = [w for w in words_b if len(w) > 1 and w not in stop_words]
-
-        if not words_a or not words_b:
-            return 0.0
-
-        # 计算词频向量
-        from collections import Counter
-        vec_a = Counter(words_a)
-        vec_b = Counter(words_b)
-
-        # 计算余弦相似度
-        intersection = set(vec_a.keys()) & set(vec_b.keys())
-        numerator = sum(vec_a[word] * vec_b[word] for word in intersection)
-
-        norm_a = math.sqrt(sum(count ** 2 for count in vec_a.values()))
-        norm_b = math.sqrt(sum(count ** 2 for count in vec_b.values()))
-
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
-
-        cosine = numerator / (norm_a * norm_b)
-        # 使用sigmoid函数将结果映射到更合理的范围
-        return 1 / (1 + math.exp(-8 * (cosine - 0.6)))
+        # 相似度是对称的，固定参数顺序使 (a, b) 与 (b, a) 命中同一缓存项
+        if a > b:
+            a, b = b, a
+        return _text_similarity(a, b)
 
     def _hf_on_user_msg(self, event: Any, chat_context: Dict):
         """用户消息到达时的心流状态更新"""
         group_id = event.get_group_id()
         if not group_id:
             # 详细日志：无群组ID，跳过心流状态更新
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 心流状态更新 - 无群组ID，跳过更新")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 心流状态更新 - 无群组ID，跳过更新")
             return
 
         state = self._hf_get_state(group_id)
-        conversation_history = chat_context.get("conversation_history", [])
+        sweep = _HistorySweep(chat_context.get("conversation_history", []), time.time())
 
         # 详细日志：心流状态更新开始
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 心流状态更新 - 群组: {group_id}, 当前能量: {state['energy']:.3f}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 心流状态更新 - 群组: %s, 当前能量: %.3f", group_id, state.energy)
 
         # 基础恢复
-        old_energy = state["energy"]
-        state["energy"] = min(1.0, state["energy"] + 0.01)
+        old_energy = state.energy
+        state.energy = min(1.0, state.energy + 0.01)
         
         # 详细日志：基础恢复
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 心流状态更新 - 基础恢复: {old_energy:.3f} -> {state['energy']:.3f}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 心流状态更新 - 基础恢复: %.3f -> %.3f", old_energy, state.energy)
 
         # 活跃度加成
-        mlm_norm = self._hf_norm_count_last_seconds(conversation_history, 60)
-        old_energy = state["energy"]
-        state["energy"] = min(1.0, state["energy"] + 0.06 * mlm_norm)
+        mlm_norm = self._hf_norm_count_last_seconds(sweep, 60)
+        old_energy = state.energy
+        state.energy = min(1.0, state.energy + 0.06 * mlm_norm)
         
         # 详细日志：活跃度加成
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 心流状态更新 - 活跃度加成: {mlm_norm:.3f}, 能量: {old_energy:.3f} -> {state['energy']:.3f}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 心流状态更新 - 活跃度加成: %.3f, 能量: %.3f -> %.3f", mlm_norm, old_energy, state.energy)
 
         # @提及加成
         is_at_me = self._hf_is_at_me(event)
         if is_at_me:
-            old_energy = state["energy"]
-            state["energy"] = min(1.0, state["energy"] + 0.10)
+            old_energy = state.energy
+            state.energy = min(1.0, state.energy + 0.10)
             # 详细日志：@提及加成
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 心流状态更新 - @提及加成: 能量: {old_energy:.3f} -> {state['energy']:.3f}")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 心流状态更新 - @提及加成: 能量: %.3f -> %.3f", old_energy, state.energy)
 
         # 连续性加成：与最近机器人回复的相似度
-        last_bot_reply = None
-        for msg in reversed(conversation_history):
-            if msg.get("role") == "assistant":
-                last_bot_reply = msg.get("content", "")
-                break
+        last_bot_reply = self._hf_last_bot_reply(group_id, sweep)
 
         if last_bot_reply:
             continuity = self._hf_similarity(last_bot_reply, event.message_str, group_id)
-            old_energy = state["energy"]
-            state["energy"] = min(1.0, state["energy"] + 0.08 * continuity)
+            old_energy = state.energy
+            state.energy = min(1.0, state.energy + 0.08 * continuity)
             # 详细日志：连续性加成
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 心流状态更新 - 连续性加成: {continuity:.3f}, 能量: {old_energy:.3f} -> {state['energy']:.3f}")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 心流状态更新 - 连续性加成: %.3f, 能量: %.3f -> %.3f", continuity, old_energy, state.energy)
 
         # 确保能量不低于最小值
-        state["energy"] = max(0.1, state["energy"])
+        state.energy = max(0.1, state.energy)
 
         # 详细日志：最终能量值
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 心流状态更新 - 最终能量: {state['energy']:.3f}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 心流状态更新 - 最终能量: %.3f", state.energy)
 
         self._hf_save_state(group_id, state)
 
@@ -744,73 +958,90 @@ class WillingnessCalculator:
         group_id = event.get_group_id()
         
         # 详细日志：开始心流门控检查
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 心流门控检查 - 开始检查群组: {group_id}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 心流门控检查 - 开始检查群组: %s", group_id)
         
         if not group_id:
             # 详细日志：无群组ID，默认通过
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 心流门控检查 - 无群组ID，默认通过")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 心流门控检查 - 无群组ID，默认通过")
             return True  # 私聊或其他情况默认通过
         
         # 获取心流状态
         state = self._hf_get_state(group_id)
-        energy = state.get("energy", 0.8)
+        energy = state.energy
         
         # 详细日志：当前心流能量
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 心流门控检查 - 群组: {group_id}, 当前能量: {energy:.3f}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 心流门控检查 - 群组: %s, 当前能量: %.3f", group_id, energy)
         
         # 检查能量阈值
         energy_threshold = 0.3  # 能量低于此值则拒绝
         if energy < energy_threshold:
             # 详细日志：能量不足，拒绝通过
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 心流门控检查 - 能量不足: {energy:.3f} < {energy_threshold}, 拒绝通过")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 心流门控检查 - 能量不足: %.3f < %s, 拒绝通过", energy, energy_threshold)
             return False
         
         # 检查冷却时间
         current_time = time.time()
-        last_reply_ts = state.get("last_reply_ts", 0)
+        last_reply_ts = state.last_reply_ts
         cooldown = 5.0  # 5秒冷却时间
         
         if current_time - last_reply_ts < cooldown:
             # 详细日志：冷却时间未到，拒绝通过
-            if self._is_detailed_logging():
-                logger.debug(f"[意愿计算器] 心流门控检查 - 冷却时间未到: 距离上次回复 {current_time - last_reply_ts:.1f}s < {cooldown}s, 拒绝通过")
+            if self._detailed_logging:
+                logger.debug("[意愿计算器] 心流门控检查 - 冷却时间未到: 距离上次回复 %.1fs < %ss, 拒绝通过", current_time - last_reply_ts, cooldown)
             return False
         
         # 详细日志：通过心流门控检查
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 心流门控检查 - 通过检查，群组: {group_id}, 能量: {energy:.3f}")
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 心流门控检查 - 通过检查，群组: %s, 能量: %.3f", group_id, energy)
         
         return True
 
-    async def on_bot_reply_update(self, event: Any, response_length: int):
-        """机器人回复后的状态更新（心流算法）"""
+    def record_bot_reply(self, group_id: Optional[str], response_content: str):
+        """记录群组最近一条机器人回复，供连续性计算直接读取（写入增量日志并随延迟保存落盘）"""
+        if group_id:
+            self.state_manager.update(f"last_bot:{group_id}", response_content)
+
+    def clear_bot_reply(self, group_id: Optional[str]):
+        """清除群组记录的最近机器人回复（对话被重置或切换后，此前的回复不再属于当前对话）"""
+        if group_id:
+            self.state_manager.delete(f"last_bot:{group_id}")
+
+    async def on_bot_reply_update(self, event: Any, response_length: int, response_content: Optional[str] = None):
+        """机器人回复后的状态更新（心流算法）
+        
+        传入 response_content 时同时记录为该群最近一条机器人回复；
+        已通过保存对话历史记录过的回复无需再传入。
+        """
         group_id = event.get_group_id()
         if not group_id:
             return
 
+        if response_content is not None:
+            self.record_bot_reply(group_id, response_content)
+
         # 获取心流状态
         state = self._hf_get_state(group_id)
         
         # 更新最后回复时间
-        state["last_reply_ts"] = time.time()
+        state.last_reply_ts = time.time()
         
         # 根据回复长度消耗能量
         # 回复越长，消耗能量越多
         energy_consumption = min(0.2, response_length / 500.0)  # 最多消耗20%能量
-        state["energy"] = max(0.1, state["energy"] - energy_consumption)
+        state.energy = max(0.1, state.energy - energy_consumption)
         
         # 更新连续回复计数
-        state["streak"] = state.get("streak", 0) + 1
+        state.streak = state.streak + 1
         
         # 保存状态
         self._hf_save_state(group_id, state)
         
         # 详细日志：心流状态更新
-        if self._is_detailed_logging():
-            logger.debug(f"[意愿计算器] 心流状态更新 - 群组: {group_id}, 回复长度: {response_length}, "
-                       f"能量消耗: {energy_consumption:.3f}, 当前能量: {state['energy']:.3f}, "
-                       f"连续回复: {state['streak']}")
\ No newline at end of file
+        if self._detailed_logging:
+            logger.debug("[意愿计算器] 心流状态更新 - 群组: %s, 回复长度: %s, "
+                         "能量消耗: %.3f, 当前能量: %.3f, "
+                         "连续回复: %s", group_id, response_length, energy_consumption, state.energy, state.streak)
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""测试公共配置：将 src 加入导入路径，未安装 AstrBot 时提供最小的 astrbot.api 替身"""
+
+import logging
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+try:
+    import astrbot.api.star  # noqa: F401
+except ImportError:
+    astrbot = types.ModuleType("astrbot")
+    api = types.ModuleType("astrbot.api")
+    star = types.ModuleType("astrbot.api.star")
+
+    class Context:
+        """插件上下文替身"""
+
+    class StarTools:
+        """插件工具替身，数据目录由 data_dir 夹具指定"""
+
+        @staticmethod
+        def get_data_dir():
+            raise AttributeError("测试需通过 data_dir 夹具指定数据目录")
+
+    api.logger = logging.getLogger("astrbot")
+    star.Context = Context
+    star.StarTools = StarTools
+    api.star = star
+    astrbot.api = api
+    sys.modules.update({"astrbot": astrbot, "astrbot.api": api, "astrbot.api.star": star})
+
+from astrbot.api.star import StarTools  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """将插件数据目录指向临时目录，返回状态管理器实际使用的插件数据目录"""
+    monkeypatch.setattr(StarTools, "get_data_dir", staticmethod(lambda *args, **kwargs: str(tmp_path)))
+    return tmp_path / "astrbot_plugin_group_chat"
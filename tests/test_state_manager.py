@@ -0,0 +1,302 @@
+"""状态管理器持久化测试"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+import state_manager as state_manager_module
+from fatigue_system import FatigueSystem
+from state_manager import FloatTable, StateManager
+
+
+def _open_manager(config=None) -> StateManager:
+    return StateManager(None, config or {})
+
+
+def _wait_for(path, timeout: float = 5.0):
+    """等待后台线程写出指定文件"""
+    deadline = time.monotonic() + timeout
+    while not path.exists():
+        assert time.monotonic() < deadline, f"等待 {path} 超时"
+        time.sleep(0.01)
+
+
+def test_state_survives_restart(data_dir):
+    manager = _open_manager()
+    manager.set("mode", "focus")
+    manager.set_interaction_mode("g1", "normal")
+    manager.increment_conversation_count("g1", "u1")
+    manager.close()
+
+    reloaded = _open_manager()
+    try:
+        assert reloaded.get("mode") == "focus"
+        assert reloaded.get_interaction_modes() == {"g1": "normal"}
+        assert reloaded.get_conversation_counts() == {"g1": {"u1": 1}}
+    finally:
+        reloaded.close()
+
+
+def test_journal_replayed_after_crash(data_dir):
+    manager = _open_manager()
+
+    async def mutate():
+        # 事件循环中的变更只写入增量日志，延迟保存尚未执行
+        manager.set("mode", "focus")
+        manager.set_focus_target("g1", "u1")
+        manager.delete("mode")
+        manager.set("mode", "normal")
+
+    asyncio.run(mutate())
+    # 不调用 close()，模拟进程崩溃
+
+    reloaded = _open_manager()
+    try:
+        assert reloaded.get("mode") == "normal"
+        assert reloaded.get_focus_targets() == {"g1": "u1"}
+    finally:
+        reloaded.close()
+
+
+def test_failed_write_recovers_without_temp_files(data_dir, monkeypatch):
+    manager = _open_manager()
+    real_fsync = state_manager_module.os.fsync
+    failures = []
+
+    def failing_fsync(fd):
+        if not failures:
+            failures.append(fd)
+            raise OSError("磁盘已满")
+        real_fsync(fd)
+
+    monkeypatch.setattr(state_manager_module.os, "fsync", failing_fsync)
+    manager.set("a", 1)
+    manager.flush()
+    assert failures
+    assert not list(data_dir.rglob("*.tmp"))
+
+    manager.set("b", 2)
+    manager.close()
+    reloaded = _open_manager()
+    try:
+        assert reloaded.get("a") == 1
+        assert reloaded.get("b") == 2
+    finally:
+        reloaded.close()
+
+
+def test_changes_during_background_write_are_kept(data_dir, monkeypatch):
+    manager = _open_manager()
+    release = threading.Event()
+    real_fsync = state_manager_module.os.fsync
+
+    def blocked_fsync(fd):
+        release.wait(5)
+        real_fsync(fd)
+
+    monkeypatch.setattr(state_manager_module.os, "fsync", blocked_fsync)
+    # 没有事件循环时立即交给后台线程写盘，写盘停在 fsync
+    manager.set_interaction_mode("g1", "normal")
+
+    async def mutate():
+        manager.set_interaction_mode("g1", "focus")
+        manager.set_interaction_mode("g2", "normal")
+
+    asyncio.run(mutate())
+    release.set()
+    manager.close()
+
+    reloaded = _open_manager()
+    try:
+        assert reloaded.get_interaction_modes() == {"g1": "focus", "g2": "normal"}
+    finally:
+        reloaded.close()
+
+
+def test_failed_write_keeps_journal_until_full_rewrite(data_dir, monkeypatch):
+    manager = _open_manager()
+    real_fsync = state_manager_module.os.fsync
+    first_write_started = threading.Event()
+    release_first_write = threading.Event()
+
+    def fsync_failing_once(fd):
+        if not first_write_started.is_set():
+            first_write_started.set()
+            release_first_write.wait(5)
+            raise OSError("磁盘已满")
+        real_fsync(fd)
+
+    monkeypatch.setattr(state_manager_module.os, "fsync", fsync_failing_once)
+    # 没有事件循环时每次变更立即生成快照：A 的快照写盘失败，之后只含 B 的快照写盘成功
+    manager.set("A", 1)
+    assert first_write_started.wait(5)
+    manager.set("B", 2)
+    release_first_write.set()
+    _wait_for(data_dir / "state" / "B.json")
+    time.sleep(0.1)
+    # 不调用 close()，模拟进程崩溃
+
+    assert not list(data_dir.rglob("*.tmp"))
+    reloaded = _open_manager()
+    try:
+        assert reloaded.get("A") == 1
+        assert reloaded.get("B") == 2
+    finally:
+        reloaded.close()
+
+
+def test_aclose_persists_changes(data_dir):
+    manager = _open_manager()
+
+    async def mutate_and_close():
+        manager.set("mode", "focus")
+        await manager.aclose()
+
+    asyncio.run(mutate_and_close())
+
+    reloaded = _open_manager()
+    try:
+        assert reloaded.get("mode") == "focus"
+    finally:
+        reloaded.close()
+
+
+def test_mapping_operations():
+    table = FloatTable({"a": 1.0, "b": 2.0})
+    table["c"] = 3.5
+    table["a"] = 4.0
+    del table["b"]
+
+    assert dict(table) == {"a": 4.0, "c": 3.5}
+    assert "b" not in table
+    assert len(table) == 2
+    assert table.copy() == {"a": 4.0, "c": 3.5}
+
+
+def test_delete_keeps_remaining_entries_addressable():
+    table = FloatTable({"a": 1.0, "b": 2.0, "c": 3.0})
+    del table["a"]
+    table["d"] = 4.0
+
+    assert dict(table) == {"b": 2.0, "c": 3.0, "d": 4.0}
+    assert table["c"] == 3.0
+
+
+def test_rejected_value_leaves_table_consistent():
+    table = FloatTable({"a": 1.0})
+    with pytest.raises(TypeError):
+        table["b"] = None
+
+    assert "b" not in table
+    assert len(table) == 1
+    assert dict(table) == {"a": 1.0}
+    table["b"] = 2.0
+    assert dict(table) == {"a": 1.0, "b": 2.0}
+
+
+def test_fatigue_table_survives_restart(data_dir):
+    manager = _open_manager()
+    manager.update_fatigue("u1", 1.5)
+    manager.update_fatigue("u2", 3.0)
+    manager.close()
+
+    reloaded = _open_manager()
+    try:
+        fatigue = reloaded.get_fatigue_data()
+        assert isinstance(fatigue, FloatTable)
+        assert dict(fatigue) == {"u1": 1.5, "u2": 3.0}
+    finally:
+        reloaded.close()
+
+
+@pytest.mark.parametrize("close_before_reload", [True, False])
+def test_tracked_users_are_capped(data_dir, close_before_reload):
+    config = {"max_tracked_users": 2}
+    manager = _open_manager(config)
+
+    async def interact():
+        for user_id in ("u1", "u2", "u3"):
+            manager.set_user_impression(user_id, {"score": 0.5})
+            manager.increment_conversation_count("g1", user_id)
+        # 访问 u2 使其成为最近使用，之后加入的 u4 淘汰 u3
+        manager.get_user_impression("u2")
+        manager.set_user_impression("u4", {"score": 0.7})
+
+    asyncio.run(interact())
+    if close_before_reload:
+        manager.close()
+
+    reloaded = _open_manager(config)
+    try:
+        assert reloaded.get_user_impression("u1") == {}
+        assert reloaded.get_user_impression("u3") == {}
+        assert reloaded.get_user_impression("u2") == {"score": 0.5}
+        assert reloaded.get_user_impression("u4") == {"score": 0.7}
+        assert reloaded.get_conversation_counts() == {"g1": {"u2": 1, "u3": 1}}
+    finally:
+        reloaded.close()
+
+
+class _FatigueConfig:
+    fatigue_enabled = True
+    fatigue_decay_rate = 0.5
+
+
+def test_fatigue_decay_survives_crash(data_dir):
+    manager = _open_manager()
+
+    async def decay():
+        manager.update_fatigue("u1", 4.0)
+        manager.update_fatigue("u2", 2.0)
+        manager.set("last_fatigue_decay_time", time.time() - 2 * 3600)
+        # 更新疲劳度前先衰减：衰减原地修改疲劳表，再以相等的新字典调用 set()
+        FatigueSystem(_FatigueConfig(), manager).update_fatigue("u3")
+
+    asyncio.run(decay())
+    expected = {"u1": 2.0, "u2": 1.0, "u3": 1.0}
+    assert dict(manager.get_fatigue_data()) == expected
+    # 不调用 close()，恢复只依赖增量日志
+
+    reloaded = _open_manager()
+    try:
+        assert dict(reloaded.get_fatigue_data()) == expected
+    finally:
+        reloaded.close()
+
+
+def test_unchanged_scalar_set_keeps_value(data_dir):
+    manager = _open_manager()
+    manager.set("mode", "focus")
+    manager.set("mode", "focus")
+    manager.set_interaction_mode("g1", "normal")
+    manager.set_interaction_mode("g1", "normal")
+    manager.close()
+
+    reloaded = _open_manager()
+    try:
+        assert reloaded.get("mode") == "focus"
+        assert reloaded.get_interaction_modes() == {"g1": "normal"}
+    finally:
+        reloaded.close()
+
+
+def test_unjournaled_update_is_saved_after_debounce(data_dir, monkeypatch):
+    monkeypatch.setattr(StateManager, "SAVE_DEBOUNCE_SECONDS", 0.01)
+    manager = _open_manager()
+
+    async def update():
+        # save=False 不写增量日志，只能依靠延迟保存写入分片
+        manager.update("heartflow:g1", {"energy": 0.5}, save=False)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(update())
+    _wait_for(data_dir / "state" / "heartflow%3Ag1.json")
+    # 不调用 close()，恢复只依赖延迟保存写出的分片
+
+    reloaded = _open_manager()
+    try:
+        assert reloaded.get("heartflow:g1") == {"energy": 0.5}
+    finally:
+        reloaded.close()